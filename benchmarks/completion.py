@@ -0,0 +1,113 @@
+"""
+Per-request overhead of dispatching an action and recording its completion, and GC pauses
+it causes
+
+    python benchmarks/completion.py [requests] [in_flight]
+"""
+import asyncio
+import gc
+import sys
+import time
+
+import midge
+from midge.core import Task
+
+
+class NoopTask:
+    @midge.action()
+    async def noop(self) -> midge.ActionResult:
+        return None, True
+
+
+class Recorder:
+    # counts logs and drops them, as swarms with sinks attached keep no logs in memory
+    def __init__(self) -> None:
+        self.recorded = 0
+
+    def on_callback(self, result) -> None:
+        # previous completion path: done callback receiving either a task or a log
+        if isinstance(result, asyncio.Task):
+            result = result.result()
+        self.recorded += 1
+
+    def on_complete(self, result) -> None:
+        self.recorded += 1
+
+
+async def callback_path(task: Task, recorder: Recorder, requests: int) -> None:
+    target = recorder.recorded + requests
+    # a coroutine and a task per request for the random delay, then a task for the action with a done callback
+    async def perform_action(delay: float) -> None:
+        await asyncio.sleep(delay)
+        future = asyncio.create_task(task.run('M'))
+        future.add_done_callback(recorder.on_callback)
+
+    await asyncio.wait([asyncio.create_task(perform_action(0)) for _ in range(requests)])
+    await _drain(recorder, target)
+
+
+async def inline_path(task: Task, recorder: Recorder, requests: int) -> None:
+    target = recorder.recorded + requests
+    # a timer handle per request for the random delay, then a task for the action reporting its own completion
+    async def run_action() -> None:
+        recorder.on_complete(await task.run('M'))
+
+    def fire() -> None:
+        asyncio.create_task(run_action())
+
+    loop = asyncio.get_running_loop()
+    for _ in range(requests):
+        loop.call_later(0, fire)
+    await _drain(recorder, target)
+
+
+async def _drain(recorder: Recorder, target: int) -> None:
+    while recorder.recorded < target:
+        await asyncio.sleep(0)
+
+
+async def _waves(path, task: Task, recorder: Recorder, requests: int, in_flight: int) -> None:
+    # a swarm keeps a bounded number of actions in flight (population or RPS), not the whole run
+    for sent in range(0, requests, in_flight):
+        await path(task, recorder, min(in_flight, requests - sent))
+
+
+def measure(path, requests: int, in_flight: int) -> dict:
+    task = Task(NoopTask)
+    recorder = Recorder()
+    pauses = []
+
+    def on_gc(phase: str, info: dict) -> None:
+        if phase == 'start':
+            pauses.append(time.perf_counter())
+        else:
+            pauses[-1] = time.perf_counter() - pauses[-1]
+
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    try:
+        start = time.perf_counter()
+        asyncio.run(_waves(path, task, recorder, requests, in_flight))
+        duration = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(on_gc)
+
+    return {
+        'us/request': duration / requests * 1e6,
+        'collections': len(pauses),
+        'gc ms': sum(pauses) * 1000,
+        'max pause ms': max(pauses, default=0) * 1000,
+    }
+
+
+if __name__ == '__main__':
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    in_flight = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    print(f'{"path":<20} {"us/request":>10} {"collections":>12} {"gc ms":>8} {"max pause ms":>13}')
+    for name, path in [
+        ('callback', callback_path),
+        ('inline', inline_path),
+    ]:
+        result = measure(path, requests, in_flight)
+        print(f'{name:<20} {result["us/request"]:10.2f} {result["collections"]:12d} '
+              f'{result["gc ms"]:8.1f} {result["max pause ms"]:13.2f}')
@@ -0,0 +1,41 @@
+"""
+Startup time of the midge CLI
+
+    python benchmarks/startup.py [repeat]
+"""
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ('matplotlib', 'numpy', 'pandas', 'seaborn')
+
+COMMANDS = {
+    'import midge.cli': 'import midge.cli',
+    'midge --help': 'import sys; from midge.cli import midgectl; sys.argv = ["midge", "--help"]; midgectl()',
+    'midge run --help': 'import sys; from midge.cli import midgectl; sys.argv = ["midge", "run", "--help"]; midgectl()',
+}
+
+
+def measure(code: str, repeat: int) -> float:
+    # return median wall time in milliseconds of a fresh interpreter running the code
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.DEVNULL)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def loaded_heavy_modules() -> str:
+    code = f'import sys, midge.cli; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    return subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout.strip()
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    baseline = measure('pass', repeat)
+    print(f'{"python (baseline)":<20} {baseline:8.1f} ms')
+    for name, code in COMMANDS.items():
+        print(f'{name:<20} {measure(code, repeat):8.1f} ms')
+    print(f'heavy modules loaded by midge.cli: {loaded_heavy_modules() or "none"}')
@@ -1,3 +1,6 @@
 from .core import Task, action, swarm, ActionResult
+from .feeder import feeder
+from .metrics import metric, timer, timing
+from .scenario import scenario
 
 __version__ = '0.1.0'
@@ -1,25 +1,48 @@
 from collections import OrderedDict, defaultdict
 from statistics import mean, pstdev
-from typing import List, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 
+from midge.errors import MidgeValueError
 from midge.record import (
-    ActionLog, FullReport, PerformanceReport, RequestsReport, ResponseTimesReport, ResponsesReport,
+    ActionLog, FullReport, GateReport, PerformanceReport, RequestsReport, ResponseTimesReport, ResponsesReport,
 )
 
+Gate = Tuple[str, float]
 
-def analyze(logs: List[ActionLog]) -> FullReport:
+BOOTSTRAP_RESAMPLES = 1000
+BOOTSTRAP_CHUNK = 50
+BOOTSTRAP_MAX_SAMPLE = 10000
+SIGNIFICANCE = 0.05
+
+# gate metric -> (sample, statistic, path to the value in a performance report)
+GATE_METRICS: Dict[str, Tuple[str, Callable, Tuple[str, ...]]] = {
+    'mean': ('response_times', np.mean, ('responses', 'response_times', 'mean')),
+    **{
+        f'p{q}': ('response_times', lambda x, axis=None, q=q: np.percentile(x, q, axis=axis),
+                  ('responses', 'response_times', f'p{q}'))
+        for q in (50, 75, 90, 95, 99)
+    },
+    'rps': ('requests_per_sec', np.mean, ('requests', 'avg_per_sec')),
+    'success_rate': ('success', np.mean, ('responses', 'success_rate')),
+}
+
+
+def analyze(logs: List[ActionLog], stop_reason: Optional[str] = None) -> FullReport:
     partitions = defaultdict(list)
     for log in logs:
         partitions[log.action].append(log)
 
     full_report: FullReport = OrderedDict()
     full_report['*'] = _analyze(logs)
+    full_report['*'].stop_reason = stop_reason
     if len(partitions) > 1:
         for action_name, action_logs in partitions.items():
             report = _analyze(action_logs)
             full_report[action_name] = report
+    for scenario_name, journey_logs in _journeys(logs).items():
+        full_report[f'journey:{scenario_name}'] = _analyze(journey_logs)
     return full_report
 
 
@@ -37,6 +60,134 @@ def compare(report: Union[PerformanceReport, FullReport],
         return comparison
 
 
+def parse_gates(gates: str) -> List[Gate]:
+    # parse 'p99:+10%,rps:-5%' into [('p99', 0.1), ('rps', -0.05)]
+    parsed = []
+    for gate in gates.split(','):
+        metric, _, limit = gate.strip().partition(':')
+        try:
+            if metric not in GATE_METRICS or not limit.endswith('%') or limit[0] not in '+-':
+                raise ValueError(gate)
+            parsed.append((metric, float(limit[:-1]) / 100))
+        except (ValueError, IndexError):
+            raise MidgeValueError('Invalid gate/s', {'gate': gate})
+    return parsed
+
+
+def gate(logs: List[ActionLog], baseline_logs: List[ActionLog], gates: List[Gate],
+         seed: Optional[int] = None) -> List[GateReport]:
+    # regression = relative change significantly beyond the limit, i.e. the whole bootstrapped CI is beyond it
+    rng = np.random.RandomState(seed)
+    samples, baseline_samples = _samples(logs), _samples(baseline_logs)
+
+    reports = []
+    for metric, limit in gates:
+        sample_name, statistic, _ = GATE_METRICS[metric]
+        change, ci_low, ci_high = _bootstrap(statistic, samples[sample_name], baseline_samples[sample_name], rng)
+        reports.append(GateReport(
+            metric=metric,
+            limit=limit,
+            change=round(change, 3),
+            ci_low=round(ci_low, 3),
+            ci_high=round(ci_high, 3),
+            regression=bool(_beyond(ci_low if limit >= 0 else ci_high, limit)),
+        ))
+    return reports
+
+
+def gate_reports(report: FullReport, baseline: FullReport, gates: List[Gate]) -> List[GateReport]:
+    # without raw logs only point values can be gated
+    reports = []
+    for metric, limit in gates:
+        _, _, path = GATE_METRICS[metric]
+        value, baseline_value = report['*'], baseline['*']
+        for attribute in path:
+            value, baseline_value = getattr(value, attribute), getattr(baseline_value, attribute)
+        change = value / baseline_value - 1 if baseline_value else np.nan
+        reports.append(GateReport(
+            metric=metric,
+            limit=limit,
+            change=round(change, 3),
+            ci_low=None,
+            ci_high=None,
+            regression=bool(_beyond(change, limit)),
+        ))
+    return reports
+
+
+def _samples(logs: List[ActionLog]) -> Dict[str, np.ndarray]:
+    start = np.fromiter((log.start for log in logs), dtype=np.float64, count=len(logs))
+    end = np.fromiter((log.end for log in logs), dtype=np.float64, count=len(logs))
+    success = np.fromiter((log.success for log in logs), dtype=np.float64, count=len(logs))
+    seconds = ((start - start.min()) // 1000).astype(np.int64)
+    return {
+        'response_times': end - start,
+        'requests_per_sec': np.bincount(seconds).astype(np.float64),
+        'success': success,
+    }
+
+
+def _bootstrap(statistic: Callable, sample: np.ndarray, baseline: np.ndarray,
+               rng: np.random.RandomState) -> Tuple[float, float, float]:
+    # return relative change of the statistic with its (1 - SIGNIFICANCE) confidence interval
+    sample = _subsample(sample, rng)
+    baseline = _subsample(baseline, rng)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = statistic(sample) / statistic(baseline) - 1
+
+        changes = np.empty(BOOTSTRAP_RESAMPLES)
+        for i in range(0, BOOTSTRAP_RESAMPLES, BOOTSTRAP_CHUNK):
+            n = min(BOOTSTRAP_CHUNK, BOOTSTRAP_RESAMPLES - i)
+            resamples = sample[rng.randint(0, len(sample), (n, len(sample)))]
+            baseline_resamples = baseline[rng.randint(0, len(baseline), (n, len(baseline)))]
+            changes[i:i + n] = statistic(resamples, axis=1) / statistic(baseline_resamples, axis=1) - 1
+
+    ci_low, ci_high = np.nanpercentile(changes, [100 * SIGNIFICANCE / 2, 100 * (1 - SIGNIFICANCE / 2)])
+    return float(change), float(ci_low), float(ci_high)
+
+
+def _subsample(sample: np.ndarray, rng: np.random.RandomState) -> np.ndarray:
+    if len(sample) <= BOOTSTRAP_MAX_SAMPLE:
+        return sample
+    return sample[rng.choice(len(sample), BOOTSTRAP_MAX_SAMPLE, replace=False)]
+
+
+def _beyond(change: float, limit: float) -> bool:
+    return change > limit if limit >= 0 else change < limit
+
+
+def _journeys(logs: List[ActionLog]) -> Dict[str, List[ActionLog]]:
+    # merge steps of each journey into a single log spanning the whole journey (think times included)
+    steps = defaultdict(list)
+    for log in logs:
+        if log.journey:
+            steps[(log.midge, log.journey)].append(log)
+
+    # same rule as follow: a journey is complete once its midge starts another one,
+    # so the last journey of each midge may be unfinished and is left out
+    last_journeys = {}
+    for (midge, journey), journey_steps in steps.items():
+        start = min(step.start for step in journey_steps)
+        if midge not in last_journeys or start > last_journeys[midge][0]:
+            last_journeys[midge] = (start, journey)
+
+    journeys = defaultdict(list)
+    for (midge, journey), journey_steps in steps.items():
+        if last_journeys[midge][1] == journey:
+            continue
+        scenario_name = journey.rpartition('#')[0]
+        journeys[scenario_name].append(ActionLog(
+            midge=midge,
+            action=scenario_name,
+            start=min(step.start for step in journey_steps),
+            end=max(step.end for step in journey_steps),
+            success=all(step.success for step in journey_steps),
+            response=None,
+        ))
+    return journeys
+
+
 def _analyze(logs: List[ActionLog]) -> PerformanceReport:
     # sort by request time
     logs = sorted(logs, key=lambda x: x.start)
@@ -56,17 +207,16 @@ def _analyze(logs: List[ActionLog]) -> PerformanceReport:
     actual_avg_rps = count / (duration / 1000)
     response_times = [(log.end - log.start) for log in logs]
 
-    # response times analysis
-    rt_total = sum(response_times)
-    rt_mean = mean(response_times)
-    rt_stdev = pstdev(response_times)
-    rt_min = min(response_times)
-    rt_max = max(response_times)
-    rt_p50 = np.percentile(response_times, 50)
-    rt_p75 = np.percentile(response_times, 75)
-    rt_p90 = np.percentile(response_times, 90)
-    rt_p95 = np.percentile(response_times, 95)
-    rt_p99 = np.percentile(response_times, 99)
+    # sub-timings (e.g. executor queue wait) and user metrics analysis
+    timings = defaultdict(list)
+    metrics = defaultdict(list)
+    for log in logs:
+        if log.timings:
+            for key, value in log.timings.items():
+                timings[key].append(value)
+        if log.metrics:
+            for key, value in log.metrics.items():
+                metrics[key].append(value)
 
     return PerformanceReport(
         duration=duration,
@@ -78,17 +228,23 @@ def _analyze(logs: List[ActionLog]) -> PerformanceReport:
             success_rate=success_rate,
             succeeded=succeeded,
             failed=failed,
-            response_times=ResponseTimesReport(
-                total=rt_total,
-                mean=rt_mean,
-                stdev=rt_stdev,
-                min=rt_min,
-                p50=rt_p50,
-                p75=rt_p75,
-                p90=rt_p90,
-                p95=rt_p95,
-                p99=rt_p99,
-                max=rt_max,
-            )
+            response_times=_analyze_times(response_times),
         ),
+        timings={key: _analyze_times(values) for key, values in timings.items()} or None,
+        metrics={key: _analyze_times(values) for key, values in metrics.items()} or None,
+    )
+
+
+def _analyze_times(times: List[float]) -> ResponseTimesReport:
+    return ResponseTimesReport(
+        total=sum(times),
+        mean=mean(times),
+        stdev=pstdev(times),
+        min=min(times),
+        p50=np.percentile(times, 50),
+        p75=np.percentile(times, 75),
+        p90=np.percentile(times, 90),
+        p95=np.percentile(times, 95),
+        p99=np.percentile(times, 99),
+        max=max(times),
     )
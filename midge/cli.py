@@ -1,104 +1,343 @@
 import asyncio
+from functools import partial
+import json
 import logging
-from typing import Callable, Dict, List
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, List, Optional
 
 import click
 
 import midge
-from midge import analysis, core, record, visualize
+from midge import core, record, sink
+from midge.errors import MidgeValueError
+from midge.profiling import Profiler
+from midge.replay import Replay
+from midge.sink import COMPRESSIONS, ChunkedLogSink, LogSink, SQLiteSink, Window
 from midge.utils import import_midge_file
 
-print(f""" 
-                     ,-.
-         `._        /  |        
-            `--._  ,   '    _,-'     888b     d888 8888888 8888888b.   .d8888b.  8888888888
-     _       __  `.|  / ,--'         8888b   d8888   888   888   Y88b d88P  Y88b 888       
-      `-._,-'  `-. \ : /             88888b.d88888   888   888    888 888    888 888       
-     ,--.-.-.-.-.-`'.'.-.,-          888Y88888P888   888   888    888 888        8888888   
-     '--'-'-'-'-'-;.'.'-'`-          888 Y888P 888   888   888    888 888  88888 888       
-     _,-' `-.__,-' / : \\             888  Y8P  888   888   888    888 888    888 888      
-                _,'|  \ `--._        888   "   888   888   888  .d88P Y88b  d88P 888       
-           _,--'   '   .     `-.     888       888 8888888 8888888P"   "Y8888P88 8888888888
-         ,'         \  |       
-                      -’             v{midge.__version__}          
-    """)
 
-_loop = asyncio.get_event_loop()
-logging.basicConfig(format='level=%(levelname)s time="%(asctime)s" message="%(message)s"', level=logging.INFO)
+# heavy modules (analysis, visualize) are imported by the commands that need them,
+# so that `midge run` starts fast and works without plotting libraries installed
+
+_DB_LOG_PATH = re.compile(r'^(?P<db>.+\.(db|sqlite3?)):(?P<run>\d+)$')
+
+FOLLOW_INTERVAL_SEC = 10
 
 
 @click.group()
 def midgectl() -> None:
-    pass
+    _print_banner()
+    logging.basicConfig(format='level=%(levelname)s time="%(asctime)s" message="%(message)s"', level=logging.INFO)
 
 
 @click.command(name='run', help='- Run a LOAD-TEST and output a LOG file')
 @click.argument('task_path', type=click.STRING)
 @click.option('--analyze', '-a', type=bool, is_flag=True, help='Analyze LOGS after LOAD-TEST finishes')
-def run_command(task_path: str, analyze: bool, ) -> None:
+@click.option('--concurrent', '-c', type=bool, is_flag=True, help='Run all SWARMS at the same time')
+@click.option('--profile', '-p', type=bool, is_flag=True, help='Profile the LOAD-TEST and output a PROFILE')
+@click.option('--seed', type=int, help='Seed making action choice, delays and feeder order reproducible')
+@click.option('--db', type=str, help='Also save LOGS into a SQLite database')
+@click.option('--rotate-size', type=int, help='Split LOGS into chunks of about N megabytes')
+@click.option('--rotate-interval', type=float, help='Split LOGS into chunks of N seconds')
+@click.option('--compress', type=click.Choice(list(COMPRESSIONS)), help='Compress LOG chunks')
+def run_command(task_path: str, analyze: bool, concurrent: bool, profile: bool, seed: Optional[int],
+                db: Optional[str], rotate_size: Optional[int], rotate_interval: Optional[float],
+                compress: Optional[str]) -> None:
     swarms = import_midge_file(task_path)
-    logs = _loop.run_until_complete(_run(swarms))
+    if seed is not None:
+        swarms = {name: partial(init_swarm, seed=seed) for name, init_swarm in swarms.items()}
+    name = os.path.splitext(os.path.basename(task_path))[0]
+    db_sink = SQLiteSink(db, name) if db else None
+    new_log_sink = LogSink
+    if rotate_size or rotate_interval or compress:
+        new_log_sink = partial(ChunkedLogSink, rotate_size=rotate_size and rotate_size * 1024 * 1024,
+                               rotate_interval=rotate_interval, compression=compress)
+    if concurrent:
+        run = _run_concurrent(swarms, name, db_sink, new_log_sink)
+    else:
+        run = _run(swarms, db_sink, new_log_sink)
+
+    if profile:
+        with Profiler(name, task_path) as profiler:
+            logs = asyncio.run(run)
+        logging.info(f'Profile saved in {profiler.save()}')
+    else:
+        logs = asyncio.run(run)
     logging.info(f'Logs are saved in {logs}')
 
+    if db_sink:
+        db_sink.close()
+        logging.info(f'Logs are saved in {db}:{db_sink.run_id}')
+
     if analyze:
         for log in logs:
             reports = _analyze(log)
             logging.info(f'Report saved in {reports}')
 
 
-@click.command(name='analyze', help='- Analyze LOG file and create a REPORT')
+@click.command(name='history', help='- Summarize all runs saved in a SQLite database')
+@click.argument('db_path', type=click.STRING)
+@click.option('--action', type=str, help='Only summarize the given action')
+def history_command(db_path: str, action: Optional[str]) -> None:
+    print(json.dumps(sink.history(db_path, action), indent=2))
+
+
+@click.command(name='analyze', help='- Analyze LOG file (or <db>:<run> in a SQLite database) and create a REPORT')
 @click.argument('log_path', type=click.STRING)
-def analyze_command(log_path: str) -> None:
-    reports = _analyze(log_path)
+@click.option('--follow', '-f', type=bool, is_flag=True, help='Keep updating the REPORT while the LOG file grows')
+@click.option('--interval', type=float, default=FOLLOW_INTERVAL_SEC, help='Seconds between REPORT updates')
+@click.option('--window', '-w', type=str, help='Only analyze requests started within SINCE:UNTIL seconds of the LOG')
+def analyze_command(log_path: str, follow: bool, interval: float, window: Optional[str]) -> None:
+    if follow:
+        _follow(log_path, interval)
+        return
+    reports = _analyze(log_path, window=_parse_window(window))
     logging.info(f'Report saved in {reports}')
 
 
-@click.command(name='compare', help='- Compare two REPORTS')
+@click.command(name='compare', help='- Compare two REPORTS (or LOGS)')
 @click.argument('baseline_path', type=str, required=True)
 @click.argument('report_path', type=str, required=True)
-def compare_command(baseline_path: str, report_path: str) -> None:
-    baseline_full = record.load(baseline_path, record.FullReport)
-    report_full = record.load(report_path, record.FullReport)
+@click.option('--gate', '-g', type=str, help='Fail on significant regressions, e.g. p99:+10%,rps:-5%')
+def compare_command(baseline_path: str, report_path: str, gate: Optional[str]) -> None:
+    from midge import analysis
+
+    try:
+        gates = analysis.parse_gates(gate) if gate else []
+    except MidgeValueError:
+        raise click.BadParameter('Expected <metric>:<+|-><limit>%, e.g. p99:+10%,rps:-5%', param_hint='--gate')
+
+    if _is_log(baseline_path) != _is_log(report_path):
+        raise click.BadParameter('Expected two LOGS or two REPORTS, not one of each', param_hint='REPORT_PATH')
+    if _is_log(baseline_path):
+        baseline_logs = _load_logs(baseline_path)
+        report_logs = _load_logs(report_path)
+        baseline_full = analysis.analyze(baseline_logs)
+        report_full = analysis.analyze(report_logs)
+        gate_reports = analysis.gate(report_logs, baseline_logs, gates) if gates else []
+    else:
+        baseline_full = record.load(baseline_path, record.FullReport)
+        report_full = record.load(report_path, record.FullReport)
+        gate_reports = analysis.gate_reports(report_full, baseline_full, gates) if gates else []
     comparison = analysis.compare(baseline_full, report_full)
 
     print(record.dumps(comparison))
 
+    if gate_reports:
+        print(record.dumps(gate_reports))
+        regressions = [report.metric for report in gate_reports if report.regression]
+        if regressions:
+            logging.error(f'Significant regression/s of {", ".join(regressions)}')
+            sys.exit(1)
+
 
 @click.command(name='visualize', help='- Visualize LOG file')
 @click.argument('file_path', type=str, required=True)
-def visualize_command(file_path: str) -> None:
-    if file_path.endswith('.log'):
-        visualize.log(file_path)
+@click.option('--format', '-f', 'output_format', type=click.Choice(['svg', 'png', 'html']), default='svg',
+              help='Format of the output file')
+@click.option('--headless', type=bool, is_flag=True, help='Only write the output file, do not show the plot')
+@click.option('--window', '-w', type=str, help='Only visualize requests started within SINCE:UNTIL seconds of the LOG')
+def visualize_command(file_path: str, output_format: str, headless: bool, window: Optional[str]) -> None:
+    from midge import visualize
+
+    if _is_log(file_path):
+        parsed_window = _parse_window(window)
+        try:
+            visualize.log(file_path, output_format=output_format, headless=headless, window=parsed_window)
+        except MidgeValueError:
+            _no_requests(file_path, parsed_window)
     elif file_path.endswith('.report'):
         visualize.report(file_path)
 
 
-async def _run(swarms: Dict[str, Callable[[], core.Swarm]]) -> List[str]:
+@click.command(name='replay', help='- Replay a timestamped TRACE and output a LOG file')
+@click.argument('task_path', type=click.STRING)
+@click.argument('trace_path', type=click.STRING)
+@click.option('--swarm', '-s', type=str, help='Name of the SWARM whose task replays the TRACE')
+@click.option('--speed', type=float, default=1., help='Speed-up factor of the TRACE timing')
+@click.option('--analyze', '-a', type=bool, is_flag=True, help='Analyze LOG after REPLAY finishes')
+def replay_command(task_path: str, trace_path: str, swarm: Optional[str], speed: float, analyze: bool) -> None:
+    swarms = import_midge_file(task_path)
+    name = swarm or next(iter(swarms))
+    replay = Replay(name, swarms[name].__midge_task__, trace_path, speed=speed)
+
+    log_file = asyncio.run(_replay(replay, name))
+    logging.info(f'Logs are saved in {log_file}')
+
+    if analyze:
+        report = _analyze(log_file)
+        logging.info(f'Report saved in {report}')
+
+
+async def _run(swarms: Dict[str, Callable[[], core.Swarm]],
+               db_sink: Optional[SQLiteSink] = None,
+               new_log_sink: Callable[[str], LogSink] = LogSink) -> List[str]:
     files = []
     for name, init_swarm in swarms.items():
         swarm = init_swarm()
+        swarm_id = _add_db_sink(db_sink, swarm, name)
+        log_sink = new_log_sink(f'{name.lower()}.log')
+        swarm.add_sink(log_sink.write)
 
         await swarm.setup()
-        logs = await swarm.run()
+        await swarm.run()
         await swarm.teardown()
 
-        log_file = f'{name.lower()}.log'
-        record.dump(logs, log_file)
-        files.append(log_file)
+        log_sink.close(swarm.stop_reason)
+        if db_sink:
+            db_sink.finish_swarm(swarm_id, swarm.stop_reason)
+        files.append(log_sink.file_path)
 
     return files
 
 
-def _analyze(log_file: str) -> str:
-    logs = record.load(log_file, List[record.ActionLog])
-    name = log_file.split('.')[0]
-    report = analysis.analyze(logs)
+async def _run_concurrent(swarms: Dict[str, Callable[[], core.Swarm]], name: str,
+                          db_sink: Optional[SQLiteSink] = None,
+                          new_log_sink: Callable[[str], LogSink] = LogSink) -> List[str]:
+    initialized = {swarm_name: init_swarm() for swarm_name, init_swarm in swarms.items()}
+    swarm_ids = {swarm_name: _add_db_sink(db_sink, swarm, swarm_name) for swarm_name, swarm in initialized.items()}
+    log_sinks = [new_log_sink(f'{swarm_name.lower()}.log') for swarm_name in initialized]
+    combined_log_sink = new_log_sink(f'{name.lower()}-combined.log')
+    for swarm, log_sink in zip(initialized.values(), log_sinks):
+        swarm.add_sink(log_sink.write)
+        swarm.add_sink(combined_log_sink.write)
+
+    # set up all swarms first, so they start swarming at the same time
+    await asyncio.gather(*[swarm.setup() for swarm in initialized.values()])
+    await asyncio.gather(*[swarm.run() for swarm in initialized.values()])
+    await asyncio.gather(*[swarm.teardown() for swarm in initialized.values()])
+
+    stop_reasons = [swarm.stop_reason for swarm in initialized.values()]
+    for log_sink, stop_reason in zip(log_sinks, stop_reasons):
+        log_sink.close(stop_reason)
+    combined_log_sink.close('; '.join(reason for reason in stop_reasons if reason) or None)
+    if db_sink:
+        for swarm_name, swarm in initialized.items():
+            db_sink.finish_swarm(swarm_ids[swarm_name], swarm.stop_reason)
+
+    return [log_sink.file_path for log_sink in [*log_sinks, combined_log_sink]]
+
+
+async def _replay(replay: Replay, name: str) -> str:
+    log_sink = LogSink(f'{name.lower()}-replay.log')
+    replay.add_sink(log_sink.write)
+
+    await replay.setup()
+    await replay.run()
+    await replay.teardown()
+
+    log_sink.close(replay.stop_reason)
+    return log_sink.file_path
+
+
+def _add_db_sink(db_sink: Optional[SQLiteSink], swarm: core.Swarm, name: str) -> Optional[int]:
+    if not db_sink:
+        return None
+    swarm_id = db_sink.add_swarm(name)
+    swarm.add_sink(partial(db_sink.write, swarm_id))
+    return swarm_id
+
+
+def _is_log(path: str) -> bool:
+    return path.endswith(('.log', f'.log{sink.INDEX_SUFFIX}')) or _DB_LOG_PATH.match(path) is not None
+
+
+def _load_logs(path: str, window: Optional[Window] = None) -> List[record.ActionLog]:
+    # load a LOG file, a chunked LOG (<file>.log.index), or a run saved in a SQLite database (<db>:<run>)
+    db_log = _DB_LOG_PATH.match(path)
+    if db_log:
+        return sink.load(db_log['db'], int(db_log['run']))
+    return sink.load_log(path, record.ActionLog, window=window)
+
+
+def _parse_window(window: Optional[str]) -> Optional[Window]:
+    # parse 'SINCE:UNTIL' in seconds, either can be left out ('3600:', ':600')
+    if not window:
+        return None
+    since, separator, until = window.partition(':')
+    try:
+        if not separator:
+            raise ValueError(window)
+        return float(since) if since else None, float(until) if until else None
+    except ValueError:
+        raise click.BadParameter('Expected SINCE:UNTIL in seconds', param_hint='--window')
+
+
+def _no_requests(log_file: str, window: Optional[Window]) -> None:
+    if window:
+        raise click.BadParameter(f'No requests of {log_file} started within the window', param_hint='--window')
+    raise click.ClickException(f'No requests in {log_file}')
+
+
+def _analyze(log_file: str, window: Optional[Window] = None) -> str:
+    from midge import analysis
+
+    logs = _load_logs(log_file, window=window)
+    if not logs:
+        _no_requests(log_file, window)
+    db_log = _DB_LOG_PATH.match(log_file)
+    if db_log:
+        stop_reason = sink.load_stop_reason(db_log['db'], int(db_log['run']))
+    else:
+        stop_reason = sink.load_log_stop_reason(log_file)
+    name = f'{db_log["db"].split(".")[0]}-run{db_log["run"]}' if db_log else log_file.split('.')[0]
+    report = analysis.analyze(logs, stop_reason=stop_reason)
     report_file = f'{name}.report'
     record.dump(report, report_file)
     return report_file
 
 
+def _follow(log_file: str, interval: float) -> None:
+    from midge.follow import Follower
+
+    if _DB_LOG_PATH.match(log_file):
+        raise click.BadParameter('Only LOG files can be followed', param_hint='LOG_PATH')
+
+    name = log_file.split('.')[0]
+    report_file, checkpoint_file = f'{name}.report', f'{name}.checkpoint'
+    checkpoint = record.load(checkpoint_file, record.FollowCheckpoint) if os.path.exists(checkpoint_file) else None
+    follower = Follower(log_file, checkpoint)
+    logging.info(f'Following {log_file} from byte {follower.offset}, report is updated in {report_file}')
+
+    try:
+        while True:
+            if follower.poll():
+                _dump_atomically(follower.report(), report_file)
+                _dump_atomically(follower.checkpoint(), checkpoint_file)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        logging.info(f'Stopped following {log_file}, resume from {checkpoint_file} with --follow')
+
+
+def _dump_atomically(obj: record.WritableRecord, file_name: str) -> None:
+    # a follower killed while writing must not leave a truncated checkpoint behind
+    record.dump(obj, f'{file_name}.tmp')
+    os.replace(f'{file_name}.tmp', file_name)
+
+
+def _print_banner() -> None:
+    print(f""" 
+                     ,-.
+         `._        /  |        
+            `--._  ,   '    _,-'     888b     d888 8888888 8888888b.   .d8888b.  8888888888
+     _       __  `.|  / ,--'         8888b   d8888   888   888   Y88b d88P  Y88b 888       
+      `-._,-'  `-. \ : /             88888b.d88888   888   888    888 888    888 888       
+     ,--.-.-.-.-.-`'.'.-.,-          888Y88888P888   888   888    888 888        8888888   
+     '--'-'-'-'-'-;.'.'-'`-          888 Y888P 888   888   888    888 888  88888 888       
+     _,-' `-.__,-' / : \\             888  Y8P  888   888   888    888 888    888 888      
+                _,'|  \ `--._        888   "   888   888   888  .d88P Y88b  d88P 888       
+           _,--'   '   .     `-.     888       888 8888888 8888888P"   "Y8888P88 8888888888
+         ,'         \  |       
+                      -’             v{midge.__version__}          
+    """)
+
+
 midgectl.add_command(run_command)
+midgectl.add_command(replay_command)
 midgectl.add_command(analyze_command)
+midgectl.add_command(history_command)
 midgectl.add_command(compare_command)
 midgectl.add_command(visualize_command)
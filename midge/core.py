@@ -1,46 +1,79 @@
+from array import array
 import asyncio
+import concurrent.futures
+from functools import partial
 import hashlib
+import heapq
+import importlib
 import itertools
 import logging
+import os
 import random
+import sys
 from threading import Timer
 import time
-from typing import Any, Callable, Coroutine, List, Optional, Tuple, Union
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
 import uuid
 
 import math
 
-from midge.errors import MidgeValueError
+from midge import profiling
+from midge.errors import FeederExhausted, MidgeValueError
+from midge.guards import Guard
+from midge.metrics import ActionContext, _context, timing
 from midge.record import (
     ActionLog, MidgeId,
 )
 
 ActionResult = Tuple[Any, bool]
+TimedActionResult = Tuple[Any, bool, float, float, Optional[Dict[str, float]], Optional[Dict[str, float]]]
 ActionFunc = Callable[[Any], Coroutine[Any, Any, ActionResult]]
+SyncActionFunc = Callable[[Any], ActionResult]
 AnyFunc = Callable[[Any], Any]
 
 TIME_PRECISION = 1000
 ROUND_PRECISION = 3
 WAIT_SEC = 0.99999
+TICK_SEC = 0.01
+# resolved lazily, process pools pull in multiprocessing
+EXECUTORS = {
+    'thread': 'ThreadPoolExecutor',
+    'process': 'ProcessPoolExecutor',
+}
+START_METHODS = ('fork', 'spawn', 'forkserver')
+MASK_64 = (1 << 64) - 1
+GOLDEN_64 = 0x9E3779B97F4A7C15
 
-_loop = asyncio.get_event_loop()
 _swarm_counter = 0
 
 
 # Decorators
 
-def action(weight: int = 1) -> AnyFunc:
-    if weight < 1:
+def action(weight: int = 1,
+           executor: Optional[str] = None,
+           max_workers: Optional[int] = None,
+           start_method: Optional[str] = None) -> AnyFunc:
+    if (weight < 1
+        or executor not in (None, *EXECUTORS)
+        or (max_workers and max_workers < 1)
+        or (start_method and (executor != 'process' or start_method not in START_METHODS))):
         raise MidgeValueError('Invalid action setting/s', locals())
 
     def decorator(func: ActionFunc) -> ActionFunc:
-        async def midge_action(*args) -> ActionResult:
+        if executor:
+            return _executor_action(func, weight, executor, max_workers, start_method)
+
+        async def midge_action(*args, **kwargs) -> ActionResult:
             try:
-                return await func(*args)
+                return await func(*args, **kwargs)
+            except FeederExhausted:
+                # not a failure of the target, the swarm has run out of test data
+                raise
             except Exception:
                 return None, False
 
         midge_action.__midge_action__ = True
+        midge_action.__midge_timed__ = False
         midge_action.__weight__ = weight
         midge_action.__name__ = func.__name__
         return midge_action
@@ -48,13 +81,138 @@ def action(weight: int = 1) -> AnyFunc:
     return decorator
 
 
+def _executor_action(func: SyncActionFunc, weight: int, executor: str, max_workers: Optional[int],
+                     start_method: Optional[str] = None) -> ActionFunc:
+    pool = None
+    failed = False
+    # process pools can not pickle the (decorated) function nor the task instance, only a reference to them
+    in_process = executor == 'process'
+    target = _SyncActionRef(func.__module__, func.__qualname__) if in_process else func
+
+    async def midge_action(*args, **kwargs) -> TimedActionResult:
+        nonlocal pool, failed
+        if pool is None:
+            pool = _new_pool(executor, max_workers, start_method, _import_root(func.__module__))
+            logging.info(f'Action {func.__name__} runs in {executor} pool with max_workers={pool._max_workers}')
+
+        submitted = now()
+        call = partial(_timed_call, target, *(args[1:] if in_process else args), **kwargs)
+        try:
+            loop = asyncio.get_running_loop()
+            response, success, start, end, timings, metrics = await loop.run_in_executor(pool, call)
+        except FeederExhausted:
+            raise
+        except Exception:
+            # e.g. arguments or a response that can not be pickled, a task module workers can not import,
+            # or a broken pool; reported once, as it usually fails every call
+            if not failed:
+                failed = True
+                logging.exception(f'Action {func.__name__} failed in {executor} pool')
+            return None, False, submitted, now(), None, None
+        return response, success, start, end, {'queue': start - submitted, **(timings or {})}, metrics
+
+    midge_action.__midge_action__ = True
+    midge_action.__midge_timed__ = True
+    midge_action.__weight__ = weight
+    midge_action.__name__ = func.__name__
+    midge_action.__wrapped__ = func
+    return midge_action
+
+
+def _new_pool(executor: str, max_workers: Optional[int], start_method: Optional[str],
+              import_root: Optional[str]) -> concurrent.futures.Executor:
+    if executor != 'process':
+        return getattr(concurrent.futures, EXECUTORS[executor])(max_workers=max_workers)
+
+    import multiprocessing
+    # spawned (not forked) workers start from a fresh interpreter and import the task module themselves,
+    # while the midge file directory is only on sys.path while the file is imported
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(start_method) if start_method else None,
+        initializer=_add_import_root,
+        initargs=(import_root,),
+    )
+
+
+def _import_root(module_name: str) -> Optional[str]:
+    # directory a module is imported from
+    file_path = getattr(sys.modules.get(module_name), '__file__', None)
+    if file_path is None:
+        return None
+    root = os.path.dirname(os.path.abspath(file_path))
+    levels = module_name.count('.') + (os.path.basename(file_path) == '__init__.py')
+    for _ in range(levels):
+        root = os.path.dirname(root)
+    return root
+
+
+def _add_import_root(import_root: Optional[str]) -> None:
+    # executed once in each worker process
+    if import_root and import_root not in sys.path:
+        sys.path.insert(0, import_root)
+
+
+def _timed_call(func: SyncActionFunc, *args, **kwargs) -> TimedActionResult:
+    # executed inside the pool; time only the actual call
+    if isinstance(func, _SyncActionRef):
+        # fails the call rather than the action, so a task that can not be resolved is reported
+        func = func.resolve()
+    context = ActionContext()
+    token = _context.set(context)
+    cpu_start = time.thread_time() if profiling.active else None
+    start = now()
+    try:
+        response, success = func(*args, **kwargs)
+    except FeederExhausted:
+        raise
+    except Exception:
+        response, success = None, False
+    finally:
+        end = now()
+        if cpu_start is not None:
+            timing('cpu', (time.thread_time() - cpu_start) * TIME_PRECISION)
+        _context.reset(token)
+    return response, success, start, end, context.timings, context.metrics
+
+
+class _SyncActionRef:
+    """
+    Picklable reference to a synchronous action method, resolved inside a worker process
+    and called on a task instance of that process
+    """
+
+    # task instances of the worker process, by (module, class qualname)
+    _instances: Dict[Tuple[str, str], Any] = {}
+
+    def __init__(self, module: str, qualname: str) -> None:
+        self.module = module
+        self.qualname = qualname
+
+    def resolve(self) -> SyncActionFunc:
+        class_name, _, name = self.qualname.rpartition('.')
+        instance = self._instances.get((self.module, class_name))
+        if instance is None:
+            cls = importlib.import_module(self.module)
+            for attribute in class_name.split('.'):
+                cls = getattr(cls, attribute)
+                # @midge.swarm replaces the class in its module, but keeps the undecorated one
+                cls = getattr(cls, '__midge_task__', cls)
+            instance = self._instances[(self.module, class_name)] = cls()
+        return partial(getattr(type(instance), name).__wrapped__, instance)
+
+
 def swarm(population: int = 1,
           rps: Optional[int] = None,
           total_requests: Optional[int] = None,
           duration: Optional[int] = None,
-          warm_up: Optional[int] = None) -> AnyFunc:
+          warm_up: Optional[int] = None,
+          compact: bool = False,
+          guards: Optional[List[Guard]] = None,
+          seed: Optional[int] = None) -> AnyFunc:
     global _swarm_counter
     _swarm_counter += 1
+    identifier = _swarm_counter
 
     if (population < 1
         or (rps and rps < 1)
@@ -63,16 +221,20 @@ def swarm(population: int = 1,
         raise MidgeValueError('Invalid swarm setting/s', locals())
 
     def decorator(cls: type) -> Callable[[], Swarm]:
-        def midge_swarm() -> Swarm:
-            return Swarm(_swarm_counter,
+        def midge_swarm(seed: Optional[int] = seed) -> Swarm:
+            return Swarm(identifier,
                          task_definition=cls,
                          population=population,
                          rps=rps,
                          total_requests=total_requests,
                          duration=duration,
-                         warm_up=warm_up)
+                         warm_up=warm_up,
+                         compact=compact,
+                         guards=guards,
+                         seed=seed)
 
         midge_swarm.__midge_swarm_constructor__ = True
+        midge_swarm.__midge_task__ = cls
         return midge_swarm
 
     return decorator
@@ -82,53 +244,164 @@ def swarm(population: int = 1,
 
 class Task:
 
-    def __init__(self, task_definition: type):
+    def __init__(self, task_definition: type, rng: Optional[random.Random] = None):
         self._instance = task_definition()
-        self._init_action_probabilities()
+        self._random = rng or random.Random()
+        self._actions, self._action_table, self._scenario_table = _task_actions(task_definition)
+        # state of the current journey (scenarios only)
+        self._scenario = None
+        self._step = None
+        self._journeys = 0
 
     async def setup(self):
         if hasattr(self._instance, 'setup'):
             await self._instance.setup()
 
-    async def run(self, midge_id: MidgeId) -> ActionLog:
-        action = self._choose_action()
-        start = now()
-        response, success = await action(self._instance)
-        end = now()
+    async def run(self, midge_id: MidgeId, rng: Optional[random.Random] = None) -> ActionLog:
+        # rng of the midge running the action, when several midges share the task (compact mode)
+        if self._scenario_table is None:
+            return await self.run_action(midge_id, self._choose_action(rng), rng=rng)
+
+        # continue the current journey, or start a new one
+        step = self._scenario.next_step(self._step, self._random) if self._scenario else None
+        if step is None:
+            self._scenario = self._scenario_table.sample(self._random)
+            self._journeys += 1
+            step = self._scenario.first_step()
+        self._step = step
+
+        think_time = self._scenario.think_time(step, self._random)
+        if think_time:
+            await asyncio.sleep(think_time)
+        return await self.run_action(midge_id, self._actions[self._scenario.action(step)],
+                                     journey=f'{self._scenario.name}#{self._journeys}')
+
+    async def run_action(self, midge_id: MidgeId, action: ActionFunc,
+                         params: Optional[Dict[str, Any]] = None,
+                         journey: Optional[str] = None,
+                         rng: Optional[random.Random] = None) -> ActionLog:
+        params = params or {}
+        if action.__midge_timed__:
+            # action times itself (e.g. the call inside an executor pool)
+            response, success, start, end, timings, metrics = await action(self._instance, **params)
+        else:
+            # collect sub-timings and metrics reported by the action
+            context = ActionContext(rng or self._random)
+            token = _context.set(context)
+            coro = action(self._instance, **params)
+            if profiling.active:
+                coro = profiling.cpu_timed(coro)
+            start = now()
+            try:
+                response, success = await coro
+            finally:
+                end = now()
+                _context.reset(token)
+            timings, metrics = context.timings, context.metrics
         return ActionLog(midge=midge_id,
                          action=action.__name__,
                          start=start,
                          end=end,
                          success=success,
-                         response=response)
+                         response=response,
+                         timings=timings,
+                         metrics=metrics,
+                         journey=journey)
 
     async def teardown(self):
         if hasattr(self._instance, 'teardown'):
             await self._instance.teardown()
 
+    def get_action(self, name: str) -> Optional[ActionFunc]:
+        return self._actions.get(name)
+
     # Utils
 
-    def _init_action_probabilities(self):
-        actions = [
-            action_method
-            for action_method in self._instance.__class__.__dict__.values()
-            if getattr(action_method, '__midge_action__', False)
-        ]
+    def _choose_action(self, rng: Optional[random.Random] = None) -> ActionFunc:
+        return self._action_table.sample(rng or self._random)
+
+
+class _MidgeRandom(random.Random):
+    """
+    Random generator of a single virtual midge, drawing from its splitmix64 state in an array
+    shared by the whole population
+    """
+
+    def __init__(self, states: array, index: int) -> None:
+        # the Mersenne Twister state of the base class is left unseeded, as it is never used
+        self._states = states
+        self._index = index
+        self.gauss_next = None
+
+    def random(self) -> float:
+        return (self._next() >> 11) * (1. / (1 << 53))
+
+    def getrandbits(self, k: int) -> int:
+        bits, n = 0, 0
+        while n < k:
+            bits = (bits << 64) | self._next()
+            n += 64
+        return bits >> (n - k)
 
-        weight_sum = sum(action.__weight__ for action in actions)
-        commutative_probability = 0
-        self._action_probabilities = {}
+    def _next(self) -> int:
+        state = (self._states[self._index] + GOLDEN_64) & MASK_64
+        self._states[self._index] = state
+        return _mix_64(state)
 
-        for action in actions:
-            probability = action.__weight__ / weight_sum
-            commutative_probability += probability
-            self._action_probabilities[commutative_probability] = action
 
-    def _choose_action(self) -> ActionFunc:
-        r = random.random()
-        for commutative_probability, action in self._action_probabilities.items():
-            if r <= commutative_probability:
-                return action
+class AliasTable:
+    """
+    Samples weighted items in O(1) using Vose's alias method
+    """
+
+    def __init__(self, items: List[Any], weights: List[float]) -> None:
+        n = len(items)
+        total = sum(weights)
+        scaled = [weight * n / total for weight in weights]
+        self._items = list(items)
+        self._probabilities = [1.] * n
+        self._aliases = list(range(n))
+
+        small = [i for i, probability in enumerate(scaled) if probability < 1]
+        large = [i for i, probability in enumerate(scaled) if probability >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self._probabilities[less] = scaled[less]
+            self._aliases[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+
+    def sample(self, rng: random.Random) -> Any:
+        # a single random number picks both the column and the item within it
+        r = rng.random() * len(self._items)
+        i = int(r)
+        return self._items[i] if r - i < self._probabilities[i] else self._items[self._aliases[i]]
+
+
+TaskActions = Tuple[Dict[str, ActionFunc], AliasTable, Optional[AliasTable]]
+
+_task_actions_cache: Dict[type, TaskActions] = {}
+
+
+def _task_actions(task_definition: type) -> TaskActions:
+    # actions, scenarios and their alias tables are built once per task definition and shared by all midges
+    if task_definition not in _task_actions_cache:
+        attributes = task_definition.__dict__.values()
+        actions = [item for item in attributes if getattr(item, '__midge_action__', False)]
+        scenarios = [item for item in attributes if getattr(item, '__midge_scenario__', False)]
+        if not actions:
+            raise MidgeValueError('Task has no actions', locals())
+
+        actions_by_name = {action.__name__: action for action in actions}
+        if any(not scenario.steps <= actions_by_name.keys() for scenario in scenarios):
+            raise MidgeValueError('Scenario refers to unknown actions', locals())
+
+        _task_actions_cache[task_definition] = (
+            actions_by_name,
+            AliasTable(actions, [action.__weight__ for action in actions]),
+            AliasTable(scenarios, [scenario.__weight__ for scenario in scenarios]) if scenarios else None,
+        )
+    return _task_actions_cache[task_definition]
 
 
 class Midge:
@@ -139,13 +412,18 @@ class Midge:
     def __init__(self, identifier: str,
                  swarm: "Swarm",
                  task: Task,
-                 on_action_complete: Callable[[Union[asyncio.Task, ActionLog]], None],
+                 on_action_complete: Callable[[ActionLog], None],
                  rps: Optional[int] = None,
-                 chance_of_action: float = 1) -> None:
+                 chance_of_action: float = 1,
+                 rng: Optional[random.Random] = None) -> None:
         self._id = f'{identifier}@{swarm._id}'
+        self._swarm = swarm
         self._task = task
+        self._random = rng or random.Random()
         self._on_action_complete = on_action_complete
         self._rps = rps
+        # the loop only keeps weak references to tasks, actions fired in RPS mode are kept here
+        self._pending = set()
         self._chance_of_action = chance_of_action
         self._active = True
 
@@ -157,40 +435,167 @@ class Midge:
 
     async def run(self) -> MidgeId:
         logging.info(f'{self._id} is running')
+        loop = asyncio.get_running_loop()
         i = 0
         while self._active:
             if self._rps:
                 # run once per second to meet RPS requirements;
                 # randomly distribute requests over one second period,
                 # than wait for approximately 1 second before triggering again
-                attacks = [self._perform_action(delay=rand_delay()) for _ in range(self._rps)]
-                await asyncio.wait(attacks)
+                delays = [rand_delay(rng=self._random) for _ in range(self._rps)]
+                for delay in delays:
+                    # timer handles are much cheaper than a coroutine and a task per request
+                    loop.call_later(delay, self._fire)
+                await asyncio.sleep(max(delays))
                 fraction, _ = math.modf(time.time())
                 wait_duration = WAIT_SEC - fraction
                 await asyncio.sleep(wait_duration)
             else:
                 # no RPS to meet, simply execute task one after another as previous one finishes
-                delay = rand_delay() if i == 0 else 0  # delay first request
-                await self._perform_action(wait=True, delay=delay)
+                delay = rand_delay(rng=self._random) if i == 0 else 0  # delay first request
+                await self._perform_action(delay=delay)
             i += 1
 
+        # drain actions that are still in flight
+        if self._pending:
+            await asyncio.wait(list(self._pending))
         return self._id
 
-    async def _perform_action(self, wait: bool = False, delay: int = 0):
+    async def _perform_action(self, delay: int = 0):
         await asyncio.sleep(delay)
 
-        if self._chance_of_action < 1 and random.random() > self._chance_of_action:
-            if wait:
-                # default to 1 sec sleep
-                await asyncio.sleep(WAIT_SEC)
+        if self._chance_of_action < 1 and self._random.random() > self._chance_of_action:
+            # default to 1 sec sleep
+            await asyncio.sleep(WAIT_SEC)
             return
 
-        if wait:
+        try:
             res = await self._task.run(self._id)
-            self._on_action_complete(res)
-        else:
-            future = _loop.create_task(self._task.run(self._id))
-            future.add_done_callback(self._on_action_complete)
+        except FeederExhausted as e:
+            self._swarm.stop(str(e))
+            return
+        self._on_action_complete(res)
+
+    def _fire(self) -> None:
+        if not self._active:
+            return
+        if self._chance_of_action < 1 and self._random.random() > self._chance_of_action:
+            return
+        self._pending.add(asyncio.create_task(self._run_action()))
+
+    async def _run_action(self) -> None:
+        # report completion from the task itself, instead of a done callback scheduled on the loop
+        try:
+            res = await self._task.run(self._id)
+        except FeederExhausted as e:
+            self._swarm.stop(str(e))
+            return
+        finally:
+            self._pending.discard(asyncio.current_task())
+        self._on_action_complete(res)
+
+    def stop(self) -> None:
+        self._active = False
+
+    def reset(self):
+        self._active = True
+
+    async def teardown(self) -> None:
+        await self._task.teardown()
+
+
+class VirtualMidges:
+    """
+    Represents a population of lightweight (virtual) midges sharing a single task instance,
+    driven by a single scheduler coroutine
+    """
+
+    def __init__(self, swarm: "Swarm",
+                 task: Task,
+                 on_action_complete: Callable[[ActionLog], None],
+                 population: int,
+                 rps_per_midges: List[Optional[int]],
+                 chance_of_action: float = 1,
+                 rng: Optional[random.Random] = None,
+                 midge_states: Optional[array] = None) -> None:
+        self._id = f'V*@{swarm._id}'
+        self._swarm = swarm
+        self._swarm_id = swarm._id
+        self._task = task
+        self._random = rng or random.Random()
+        # per-midge random states (seeded runs only), so sequences do not depend on the order actions complete in
+        self._midge_states = midge_states
+        self._on_action_complete = on_action_complete
+        self._population = population
+        self._closed_loop = not any(rps_per_midges)
+        # per-midge time between two consecutive actions (RPS mode only)
+        self._intervals = array('d', [1 / rps if rps else 0. for rps in rps_per_midges])
+        self._schedule: List[Tuple[float, int]] = []
+        self._pending = set()
+        self._chance_of_action = chance_of_action
+        self._active = True
+
+    def set_chance_of_action(self, chance_of_action):
+        self._chance_of_action = chance_of_action
+
+    async def setup(self):
+        await self._task.setup()
+
+    async def run(self) -> MidgeId:
+        logging.info(f'{self._population} virtual midges of {self._swarm_id} are running')
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # delay first request of each midge; midges with no share of RPS never fire
+        self._schedule = [
+            (start + rand_delay(rng=self._midge_random(index)), index)
+            for index in range(self._population)
+            if self._closed_loop or self._intervals[index]
+        ]
+        heapq.heapify(self._schedule)
+
+        while self._active:
+            current = loop.time()
+            while self._schedule and self._schedule[0][0] <= current:
+                fire_at, index = heapq.heappop(self._schedule)
+                self._dispatch(index, fire_at, current)
+            wait_duration = self._schedule[0][0] - current if self._schedule else TICK_SEC
+            await asyncio.sleep(min(wait_duration, TICK_SEC))
+
+        # drain actions that are still in flight
+        if self._pending:
+            await asyncio.wait(list(self._pending))
+        return self._id
+
+    def _dispatch(self, index: int, fire_at: float, current: float) -> None:
+        if not self._closed_loop:
+            # keep the rate regardless of how long the action takes
+            heapq.heappush(self._schedule, (fire_at + self._intervals[index], index))
+
+        if self._chance_of_action < 1 and self._midge_random(index).random() > self._chance_of_action:
+            if self._closed_loop:
+                # default to 1 sec sleep
+                heapq.heappush(self._schedule, (current + WAIT_SEC, index))
+            return
+
+        self._pending.add(asyncio.create_task(self._run_action(index)))
+
+    def _midge_random(self, index: int) -> random.Random:
+        if self._midge_states is None:
+            return self._random
+        return _MidgeRandom(self._midge_states, index)
+
+    async def _run_action(self, index: int) -> None:
+        # report completion from the task itself, instead of a done callback scheduled on the loop
+        try:
+            log = await self._task.run(f'V{index}@{self._swarm_id}', self._midge_random(index))
+        except FeederExhausted as e:
+            self._swarm.stop(str(e))
+            return
+        finally:
+            self._pending.discard(asyncio.current_task())
+        self._on_action_complete(log)
+        if self._closed_loop and self._active:
+            heapq.heappush(self._schedule, (asyncio.get_running_loop().time(), index))
 
     def stop(self) -> None:
         self._active = False
@@ -213,7 +618,10 @@ class Swarm:
                  rps: Optional[int] = None,
                  total_requests: Optional[int] = None,
                  duration: Optional[int] = None,
-                 warm_up: Optional[int] = None):
+                 warm_up: Optional[int] = None,
+                 compact: bool = False,
+                 guards: Optional[List[Guard]] = None,
+                 seed: Optional[int] = None):
         self._id = f'S{identifier}'
         self._task_definition = task_definition
         self._population = population
@@ -221,14 +629,22 @@ class Swarm:
         self._total_requests_limit = total_requests
         self._duration = duration
         self._warm_up = warm_up
+        self._compact = compact
+        self._guards = guards or []
+        self._seed = seed
+        if (rps or compact) and _task_actions(task_definition)[2]:
+            # journeys are sequential, so they need a closed-loop midge of their own
+            raise MidgeValueError('Scenarios are only supported by closed-loop (no RPS), non-compact swarms', locals())
         self._total_requests_counter = itertools.count()
+        self._sinks: List[Callable[[ActionLog], None]] = []
         self._active = False
+        self.stop_reason: Optional[str] = None
 
     async def setup(self):
         self._midges = self._spawn_midges(self._population, self._rps)
         coros = [midge.setup() for midge in self._midges]
         await asyncio.gather(*coros)
-        logging.info(f'Swarm {self._id} with {len(self._midges)} Midges is ready')
+        logging.info(f'Swarm {self._id} with {self._population} Midges is ready')
 
     async def warmup(self, steps: int = 10) -> None:
         step_time = self._warm_up / steps
@@ -245,12 +661,14 @@ class Swarm:
         [midge.reset() for midge in self._midges]
 
     async def run(self) -> List[ActionLog]:
-
         if self._warm_up:
             await self.warmup()
 
         self._active = True
         self._logs = []
+        self.stop_reason = None
+        for guard in self._guards:
+            guard.reset()
 
         if self._duration:
             t = Timer(self._duration, self.stop, kwargs=dict(reason='Time duration is reached'))
@@ -265,8 +683,14 @@ class Swarm:
 
         return self._logs
 
+    def add_sink(self, sink: Callable[[ActionLog], None]) -> None:
+        # sinks receive every action log as it is recorded; logs are only kept in memory without sinks
+        self._sinks.append(sink)
+
     def stop(self, reason: str):
         logging.info(f'Stopping Midges - {reason}')
+        if self._active:
+            self.stop_reason = reason
         self._active = False
         for t in self._midges:
             t.stop()
@@ -278,7 +702,7 @@ class Swarm:
 
     # Utils
 
-    def _spawn_midges(self, n: int, rps: int) -> List[Midge]:
+    def _spawn_midges(self, n: int, rps: int) -> List[Union[Midge, VirtualMidges]]:
         rps_per_midges = [None] * n
         if rps:
             # distribute RPS rate across midges
@@ -286,14 +710,39 @@ class Swarm:
             rps_remaining = rps - (rps_per_midge * n)
             rps_per_midges = [rps_per_midge + 1 if i < rps_remaining else rps_per_midge
                               for i, _ in enumerate(rps_per_midges)]
-        return [
-            Midge(identifier=str(hashlib.md5(uuid.uuid4().bytes).hexdigest()[:6]),
-                  swarm=self,
-                  task=Task(self._task_definition),
-                  on_action_complete=self._on_action_complete,
-                  rps=rps)
-            for i, rps in enumerate(rps_per_midges)
-        ]
+        if self._compact:
+            rng = self._midge_random('*')
+            midge_states = None
+            if self._seed is not None:
+                # 8 bytes of random state per midge, instead of a few KB for a generator of its own
+                key = rng.getrandbits(64)
+                midge_states = array('Q', (_mix_64((key + i * GOLDEN_64) & MASK_64) for i in range(n)))
+            return [
+                VirtualMidges(swarm=self,
+                              task=Task(self._task_definition, rng=rng),
+                              on_action_complete=self._on_action_complete,
+                              population=n,
+                              rps_per_midges=rps_per_midges,
+                              rng=rng,
+                              midge_states=midge_states)
+            ]
+        midges = []
+        for i, rps in enumerate(rps_per_midges):
+            rng = self._midge_random(i)
+            identifier = uuid.UUID(int=rng.getrandbits(128)) if self._seed is not None else uuid.uuid4()
+            midges.append(Midge(identifier=str(hashlib.md5(identifier.bytes).hexdigest()[:6]),
+                                swarm=self,
+                                task=Task(self._task_definition, rng=rng),
+                                on_action_complete=self._on_action_complete,
+                                rps=rps,
+                                rng=rng))
+        return midges
+
+    def _midge_random(self, index: Union[int, str]) -> random.Random:
+        # with a seed, every midge gets its own deterministic random sequence
+        if self._seed is None:
+            return random.Random()
+        return random.Random(f'{self._seed}:{self._id}:{index}')
 
     def _modify_midges(self, chance_of_action: float):
         logging.info(f'Modifying midges - COA={chance_of_action}')
@@ -302,25 +751,39 @@ class Swarm:
 
     # Callbacks
 
-    def _on_action_complete(self, result: Union[asyncio.Task, ActionLog]) -> None:
+    def _on_action_complete(self, result: ActionLog) -> None:
         if not self._active:
             return
 
         count = next(self._total_requests_counter)
-        if (count + 1) >= self._total_requests_limit:
+        if self._total_requests_limit and (count + 1) >= self._total_requests_limit:
             self.stop('Total requests are reached')
 
-        if isinstance(result, asyncio.Task):
-            result = result.result()
-        self._logs.append(result)
+        if not self._sinks:
+            self._logs.append(result)
+        for sink in self._sinks:
+            sink(result)
+
+        for guard in self._guards:
+            reason = guard.update(result)
+            if reason:
+                self.stop(reason)
+                break
 
 # Utils
 
-def rand_delay(min: float = 0., max: float = 1.) -> int:
+def _mix_64(x: int) -> int:
+    # splitmix64 finalizer
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return x ^ (x >> 31)
+
+
+def rand_delay(min: float = 0., max: float = 1., rng: random.Random = random) -> int:
     # return random delay in seconds
     if min >= max:
         raise ValueError('Invalid range - max must be bigger than min')
-    return min + (random.random() % (max - min))
+    return min + (rng.random() % (max - min))
 
 
 def now() -> float:
@@ -18,7 +18,15 @@ class MidgeValueError(ValueError):
         return self.__repr__()
 
 
+class FeederExhausted(Exception):
+    """ A feeder has no records left to hand out. """
+
+
 def argvals(frame) -> str:
-    args, _, _, values = inspect.getargvalues(frame)
-    ctx = {i: values[i] for i in args}
-    return json.dumps(ctx)
+    if isinstance(frame, dict):
+        # locals() of the caller
+        ctx = frame
+    else:
+        args, _, _, values = inspect.getargvalues(frame)
+        ctx = {i: values[i] for i in args}
+    return json.dumps(ctx, default=repr)
@@ -0,0 +1,148 @@
+import csv
+import json
+import mmap
+import os
+import random
+from array import array
+from threading import Lock
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+from midge.errors import FeederExhausted, MidgeValueError
+from midge.metrics import _context
+
+ORDERS = ('sequential', 'random', 'unique')
+
+_feeders: Dict[Tuple[str, str, int, int], 'Feeder'] = {}
+
+
+def feeder(file_path: str,
+           order: str = 'sequential',
+           shard: int = 0,
+           shards: int = 1) -> 'Feeder':
+    if (order not in ORDERS
+        or shards < 1
+        or not 0 <= shard < shards):
+        raise MidgeValueError('Invalid feeder setting/s', locals())
+
+    # one feeder per file (and order) per process, shared by all midges
+    key = (os.path.abspath(file_path), order, shard, shards)
+    if key not in _feeders:
+        _feeders[key] = Feeder(*key)
+    return _feeders[key]
+
+
+class Feeder:
+    """
+    Hands out records of a memory-mapped data file (CSV, JSONL or plain lines) to actions
+    """
+
+    def __init__(self, file_path: str, order: str, shard: int, shards: int) -> None:
+        self._file_path = file_path
+        self._order = order
+        self._shard = shard
+        self._shards = shards
+        self._random = random.Random()
+        self._lock = Lock()
+        self._mmap: Optional[Union[mmap.mmap, bytes]] = None
+        self._opened = False
+        self._header = None
+        self._data_start = 0
+        self._position = 0
+        self._row = 0
+        self._offsets = array('Q')
+
+    def __iter__(self) -> Iterator[Any]:
+        # iterating ends once the feeder is exhausted
+        while True:
+            try:
+                yield next(self)
+            except FeederExhausted:
+                return
+
+    def __next__(self) -> Any:
+        # a StopIteration raised in an action would surface as a RuntimeError, i.e. a failed request
+        if not self._opened:
+            self._open()
+
+        if self._order == 'random':
+            if not self._offsets:
+                raise FeederExhausted(f'No records in {self._file_path}')
+            # draw with the random generator of the running midge, so seeded runs are reproducible
+            context = _context.get()
+            rng = context.random if context and context.random else self._random
+            offset = self._offsets[rng.randrange(len(self._offsets))]
+            return self._parse(self._line_at(offset))
+
+        with self._lock:
+            entry = self._read_line()
+            if entry is None:
+                if self._order == 'unique':
+                    raise FeederExhausted(f'All records of {self._file_path} are used')
+                # start over
+                self._position, self._row = self._data_start, 0
+                entry = self._read_line()
+                if entry is None:
+                    raise FeederExhausted(f'No records in {self._file_path}')
+        return self._parse(entry[1])
+
+    def close(self) -> None:
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+            self._mmap = None
+            self._opened = False
+
+    # Utils
+
+    def _open(self) -> None:
+        with self._lock:
+            if self._opened:
+                return
+            with open(self._file_path, 'rb') as input_file:
+                # an empty file can not be memory-mapped
+                empty = os.fstat(input_file.fileno()).st_size == 0
+                data = b'' if empty else mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            if self._file_path.endswith('.csv') and data:
+                end = self._line_end(data, 0)
+                self._header = next(csv.reader([data[:end].decode().rstrip('\r')]))
+                self._data_start = self._position = end + 1
+
+            self._mmap = data
+            if self._order == 'random':
+                # index line offsets of this shard, so each draw is a single lookup
+                entry = self._read_line()
+                while entry is not None:
+                    self._offsets.append(entry[0])
+                    entry = self._read_line()
+            self._opened = True
+
+    def _read_line(self) -> Optional[Tuple[int, bytes]]:
+        # return offset and content of the next non-empty line of this shard
+        while self._position < len(self._mmap):
+            start = self._position
+            end = self._line_end(self._mmap, start)
+            self._position = end + 1
+            line = self._mmap[start:end]
+            if not line.strip():
+                continue
+            row = self._row
+            self._row += 1
+            if row % self._shards == self._shard:
+                return start, line
+        return None
+
+    def _line_at(self, offset: int) -> bytes:
+        return self._mmap[offset:self._line_end(self._mmap, offset)]
+
+    def _parse(self, line: bytes) -> Any:
+        text = line.decode().rstrip('\r')
+        if self._header is not None:
+            return dict(zip(self._header, next(csv.reader([text]))))
+        if self._file_path.endswith('.jsonl'):
+            return json.loads(text)
+        return text
+
+    @staticmethod
+    def _line_end(data: mmap.mmap, start: int) -> int:
+        end = data.find(b'\n', start)
+        return len(data) if end == -1 else end
@@ -0,0 +1,270 @@
+from collections import OrderedDict
+import json
+import math
+import os
+from typing import Any, Dict, Optional
+
+from midge.errors import MidgeValueError
+from midge.record import (
+    FollowCheckpoint, FullReport, JourneyState, LogChunk, MidgeId, PerformanceReport, ReportState, RequestsReport,
+    ResponseTimesReport, ResponsesReport, SeriesState, loadd,
+)
+from midge.sink import INDEX_SUFFIX, read_chunk
+
+READ_SIZE = 16 * 1024 * 1024
+# values are counted in logarithmic buckets, so percentiles are within ~1% of the exact ones
+BUCKET_BASE = 1.02
+
+
+class Series:
+    """
+    Streaming summary of values: count, mean and deviation (Welford), extremes and a histogram for percentiles
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max', 'buckets')
+
+    def __init__(self, state: Optional[SeriesState] = None) -> None:
+        self.count = state.count if state else 0
+        self.mean = state.mean if state else 0.
+        self.m2 = state.m2 if state else 0.
+        self.min = state.min if state else math.inf
+        self.max = state.max if state else -math.inf
+        self.buckets: Dict[float, int] = {float(bucket): count for bucket, count in state.buckets.items()} \
+            if state else {}
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        bucket = _bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, q: float) -> float:
+        rank = q / 100 * (self.count - 1)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen > rank:
+                return min(max(bucket, self.min), self.max)
+        return self.max
+
+    def report(self) -> ResponseTimesReport:
+        return ResponseTimesReport(
+            total=self.mean * self.count,
+            mean=self.mean,
+            stdev=math.sqrt(self.m2 / self.count),
+            min=self.min,
+            p50=self.percentile(50),
+            p75=self.percentile(75),
+            p90=self.percentile(90),
+            p95=self.percentile(95),
+            p99=self.percentile(99),
+            max=self.max,
+        )
+
+    def state(self) -> SeriesState:
+        return SeriesState(
+            count=self.count,
+            mean=self.mean,
+            m2=self.m2,
+            min=self.min,
+            max=self.max,
+            buckets={repr(bucket): count for bucket, count in self.buckets.items()},
+        )
+
+
+class Aggregate:
+    """
+    Streaming state of a single performance report (all actions, an action or journeys of a scenario)
+    """
+
+    __slots__ = ('first_start', 'last_start', 'last_end', 'succeeded', 'response_times', 'timings', 'metrics')
+
+    def __init__(self, state: Optional[ReportState] = None) -> None:
+        self.first_start = state.first_start if state else math.inf
+        self.last_start = state.last_start if state else -math.inf
+        self.last_end = state.last_end if state else -math.inf
+        self.succeeded = state.succeeded if state else 0
+        self.response_times = Series(state.response_times if state else None)
+        self.timings = {key: Series(series) for key, series in state.timings.items()} if state else {}
+        self.metrics = {key: Series(series) for key, series in state.metrics.items()} if state else {}
+
+    def add(self, start: float, end: float, success: bool,
+            timings: Optional[Dict[str, float]] = None,
+            metrics: Optional[Dict[str, float]] = None) -> None:
+        # duration spans from the first request to the end of the last one, as in a full analysis
+        if start < self.first_start:
+            self.first_start = start
+        if start >= self.last_start:
+            self.last_start, self.last_end = start, end
+        if success:
+            self.succeeded += 1
+        self.response_times.add(end - start)
+
+        if timings:
+            for key, value in timings.items():
+                self.timings.setdefault(key, Series()).add(value)
+        if metrics:
+            for key, value in metrics.items():
+                self.metrics.setdefault(key, Series()).add(value)
+
+    def report(self) -> PerformanceReport:
+        count = self.response_times.count
+        duration = self.last_end - self.first_start
+        return PerformanceReport(
+            duration=duration,
+            requests=RequestsReport(
+                total=count,
+                avg_per_sec=count / (duration / 1000) if duration else math.nan,
+            ),
+            responses=ResponsesReport(
+                success_rate=self.succeeded / count,
+                succeeded=self.succeeded,
+                failed=count - self.succeeded,
+                response_times=self.response_times.report(),
+            ),
+            timings={key: series.report() for key, series in self.timings.items()} or None,
+            metrics={key: series.report() for key, series in self.metrics.items()} or None,
+        )
+
+    def state(self) -> ReportState:
+        return ReportState(
+            first_start=self.first_start,
+            last_start=self.last_start,
+            last_end=self.last_end,
+            succeeded=self.succeeded,
+            response_times=self.response_times.state(),
+            timings={key: series.state() for key, series in self.timings.items()},
+            metrics={key: series.state() for key, series in self.metrics.items()},
+        )
+
+
+class Follower:
+    """
+    Analyzes a LOG file while it is being written: only appended lines are read and folded into aggregates,
+    which can be checkpointed to resume after a restart without reading the LOG again
+    """
+
+    def __init__(self, log_file: str, checkpoint: Optional[FollowCheckpoint] = None) -> None:
+        self._log_file = log_file
+        self.offset = 0
+        self._first_line = ''
+        self._aggregates: Dict[str, Aggregate] = OrderedDict()
+        # journey in progress per midge; it is complete once its midge starts another one
+        self._journeys: Dict[MidgeId, JourneyState] = {}
+
+        if checkpoint and self._resumable(checkpoint):
+            self.offset = checkpoint.offset
+            self._first_line = checkpoint.first_line
+            self._aggregates.update((key, Aggregate(state)) for key, state in checkpoint.reports.items())
+            self._journeys.update(checkpoint.journeys)
+
+    def poll(self) -> int:
+        # fold complete lines appended since the last poll and return their number
+        count = 0
+        if not os.path.exists(self._log_file):
+            # the run has not started writing yet
+            return count
+        with open(self._log_file, 'rb') as input_file:
+            if self.offset == 0 and input_file.read(1) == b'[':
+                raise MidgeValueError('Invalid log to follow, expected JSON lines', {'log_file': self._log_file})
+            input_file.seek(self.offset)
+
+            while True:
+                data = input_file.read(READ_SIZE)
+                # a partially written last line is left for the next poll
+                end = data.rfind(b'\n') + 1
+                if not end:
+                    break
+                if self.offset == 0:
+                    self._first_line = data[:data.index(b'\n')].decode()
+
+                for line in data[:end].splitlines():
+                    if line.strip():
+                        count += self._add_line(line)
+                self.offset += end
+                input_file.seek(self.offset)
+        return count
+
+    def report(self) -> FullReport:
+        # same layout as a full analysis; journeys in progress are reported once complete
+        full_report: FullReport = OrderedDict()
+        if '*' not in self._aggregates:
+            return full_report
+
+        full_report['*'] = self._aggregates['*'].report()
+        actions = [key for key in self._aggregates if key != '*' and not key.startswith('journey:')]
+        if len(actions) > 1:
+            for key in actions:
+                full_report[key] = self._aggregates[key].report()
+        for key, aggregate in self._aggregates.items():
+            if key.startswith('journey:'):
+                full_report[key] = aggregate.report()
+        return full_report
+
+    def checkpoint(self) -> FollowCheckpoint:
+        return FollowCheckpoint(
+            offset=self.offset,
+            first_line=self._first_line,
+            reports={key: aggregate.state() for key, aggregate in self._aggregates.items()},
+            journeys=dict(self._journeys),
+        )
+
+    # Utils
+
+    def _add_line(self, line: bytes) -> int:
+        # lines of a chunked LOG index are finished chunks, folded as a whole
+        if not self._log_file.endswith(INDEX_SUFFIX):
+            self._add(json.loads(line))
+            return 1
+        logs = read_chunk(os.path.dirname(self._log_file), loadd(json.loads(line), LogChunk))
+        for log in logs:
+            self._add(log)
+        return len(logs)
+
+    def _add(self, log: Dict[str, Any]) -> None:
+        # raw records are enough for aggregation, no need to unmarshal them into ActionLogs
+        start, end, success = log['start'], log['end'], log['success']
+        self._aggregate('*').add(start, end, success, log.get('timings'), log.get('metrics'))
+        self._aggregate(log['action']).add(start, end, success, log.get('timings'), log.get('metrics'))
+
+        journey = log.get('journey')
+        if journey:
+            self._add_step(log['midge'], journey, start, end, success)
+
+    def _add_step(self, midge: MidgeId, journey: str, start: float, end: float, success: bool) -> None:
+        current = self._journeys.get(midge)
+        if current and current.journey == journey:
+            current.start = min(current.start, start)
+            current.end = max(current.end, end)
+            current.success = current.success and success
+            return
+
+        if current:
+            scenario_name = current.journey.rpartition('#')[0]
+            self._aggregate(f'journey:{scenario_name}').add(current.start, current.end, current.success)
+        self._journeys[midge] = JourneyState(journey=journey, start=start, end=end, success=success)
+
+    def _aggregate(self, key: str) -> Aggregate:
+        aggregate = self._aggregates.get(key)
+        if aggregate is None:
+            aggregate = self._aggregates[key] = Aggregate()
+        return aggregate
+
+    def _resumable(self, checkpoint: FollowCheckpoint) -> bool:
+        # the checkpoint must belong to this LOG, not to an earlier LOG of the same name
+        if os.path.getsize(self._log_file) < checkpoint.offset:
+            return False
+        with open(self._log_file, 'rb') as input_file:
+            return input_file.readline().rstrip(b'\n').decode() == checkpoint.first_line
+
+
+def _bucket(value: float) -> float:
+    if value == 0:
+        return 0.
+    return math.copysign(BUCKET_BASE ** round(math.log(abs(value), BUCKET_BASE)), value)
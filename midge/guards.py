@@ -0,0 +1,138 @@
+from abc import ABC, abstractmethod
+from collections import deque
+import heapq
+import math
+import time
+from typing import Deque, List, Optional, Tuple
+
+from midge.errors import MidgeValueError
+from midge.record import ActionLog
+
+EVALUATIONS_PER_WINDOW = 10
+
+
+class Guard(ABC):
+    """
+    Stop condition of a swarm, evaluated on every completed action
+    """
+
+    def reset(self) -> None:
+        pass
+
+    @abstractmethod
+    def update(self, log: ActionLog) -> Optional[str]:
+        # return the reason for stopping the swarm, if the condition is met
+        pass
+
+
+class ErrorRate(Guard):
+    """
+    Stops the swarm when the share of failed actions over a sliding window exceeds max_rate
+    """
+
+    def __init__(self, max_rate: float, window: int = 10, min_requests: int = 100) -> None:
+        if not 0 <= max_rate < 1 or window < 1 or min_requests < 1:
+            raise MidgeValueError('Invalid guard setting/s', locals())
+        self._max_rate = max_rate
+        self._window = window * 1000
+        self._min_requests = min_requests
+        self.reset()
+
+    def reset(self) -> None:
+        self._logs: Deque[Tuple[float, bool]] = deque()
+        self._failed = 0
+
+    def update(self, log: ActionLog) -> Optional[str]:
+        self._logs.append((log.end, log.success))
+        self._failed += not log.success
+
+        # evict actions that fell out of the window
+        while self._logs[0][0] <= log.end - self._window:
+            _, success = self._logs.popleft()
+            self._failed -= not success
+
+        total = len(self._logs)
+        if total >= self._min_requests and self._failed / total > self._max_rate:
+            return f'Error rate {self._failed / total:.1%} exceeded {self._max_rate:.1%}'
+        return None
+
+
+class Latency(Guard):
+    """
+    Stops the swarm when a response time percentile over a sliding window of completion time
+    stays above threshold (ms) for duration seconds
+    """
+
+    def __init__(self, threshold: float, percentile: float = 99, duration: int = 10, window: int = 1) -> None:
+        if threshold <= 0 or not 0 < percentile <= 100 or duration < 1 or window < 1:
+            raise MidgeValueError('Invalid guard setting/s', locals())
+        self._threshold = threshold
+        self._percentile = percentile
+        self._duration = duration * 1000
+        self._window = window * 1000
+        self.reset()
+
+    def reset(self) -> None:
+        # (end, response time) of actions within the window; a heap, as concurrent actions complete out of order
+        self._logs: List[Tuple[float, float]] = []
+        self._now = -math.inf
+        self._evaluated = -math.inf
+        self._breached_since: Optional[float] = None
+
+    def update(self, log: ActionLog) -> Optional[str]:
+        self._now = max(self._now, log.end)
+        heapq.heappush(self._logs, (log.end, log.end - log.start))
+        while self._logs[0][0] <= self._now - self._window:
+            heapq.heappop(self._logs)
+
+        # sorting the window on every action would be costly, a few evaluations per window are enough
+        if self._now - self._evaluated < self._window / EVALUATIONS_PER_WINDOW:
+            return None
+        self._evaluated = self._now
+        return self._evaluate()
+
+    def _evaluate(self) -> Optional[str]:
+        response_times = sorted(response_time for _, response_time in self._logs)
+        index = max(math.ceil(len(response_times) * self._percentile / 100) - 1, 0)
+        if response_times[index] <= self._threshold:
+            self._breached_since = None
+            return None
+
+        if self._breached_since is None:
+            self._breached_since = self._logs[0][0]
+        if self._now - self._breached_since >= self._duration:
+            return f'p{self._percentile:g} response time exceeded {self._threshold}ms for {self._duration // 1000}s'
+        return None
+
+
+class Saturation(Guard):
+    """
+    Stops the swarm when midge itself uses more than max_cpu of a CPU core for duration seconds
+    """
+
+    def __init__(self, max_cpu: float = 0.9, duration: int = 10) -> None:
+        if not 0 < max_cpu <= 1 or duration < 1:
+            raise MidgeValueError('Invalid guard setting/s', locals())
+        self._max_cpu = max_cpu
+        self._duration = duration
+        self.reset()
+
+    def reset(self) -> None:
+        self._wall = time.monotonic()
+        self._cpu = time.process_time()
+        self._saturated_for = 0.
+
+    def update(self, log: ActionLog) -> Optional[str]:
+        wall = time.monotonic()
+        elapsed = wall - self._wall
+        if elapsed < 1:
+            return None
+
+        usage = (time.process_time() - self._cpu) / elapsed
+        self._wall, self._cpu = wall, time.process_time()
+
+        # evaluated on completions, at most once a second; when saturated they may be seconds apart
+        self._saturated_for = self._saturated_for + elapsed if usage > self._max_cpu else 0.
+        if self._saturated_for >= self._duration:
+            return f'Load generator is saturated ({usage:.0%} CPU) for {self._duration}s'
+        return None
@@ -0,0 +1,57 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import random
+import time
+from typing import Dict, Iterator, Optional
+
+TIME_PRECISION = 1000
+ROUND_PRECISION = 3
+
+
+class ActionContext:
+    """
+    Collects sub-timings and user metrics of a single action
+    """
+
+    __slots__ = ('timings', 'metrics', 'random')
+
+    def __init__(self, rng: Optional[random.Random] = None) -> None:
+        # created on first use, so actions without sub-timings or metrics stay cheap
+        self.timings: Optional[Dict[str, float]] = None
+        self.metrics: Optional[Dict[str, float]] = None
+        # random generator of the midge running the action
+        self.random = rng
+
+
+_context: ContextVar[Optional[ActionContext]] = ContextVar('midge_action_context', default=None)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    # time a phase of the current action in milliseconds; repeated phases are summed up
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing(name, (time.perf_counter() - start) * TIME_PRECISION)
+
+
+def timing(name: str, duration: float) -> None:
+    # record an already measured phase (in milliseconds) of the current action
+    context = _context.get()
+    if context is None:
+        return
+    if context.timings is None:
+        context.timings = {}
+    context.timings[name] = round(context.timings.get(name, 0) + duration, ROUND_PRECISION)
+
+
+def metric(name: str, value: float) -> None:
+    # record a user metric of the current action
+    context = _context.get()
+    if context is None:
+        return
+    if context.metrics is None:
+        context.metrics = {}
+    context.metrics[name] = value
+
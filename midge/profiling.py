@@ -0,0 +1,95 @@
+import cProfile
+import os
+import pstats
+import time
+import types
+from typing import Any, Coroutine, Dict, List
+
+from midge.metrics import TIME_PRECISION, timing
+from midge.record import FrameReport, ProfileCategoryReport, ProfileReport, dump
+
+TOP_FRAMES = 15
+
+# set while a run is profiled, so actions also measure their own CPU time
+active = False
+
+
+@types.coroutine
+def cpu_timed(coro: Coroutine) -> Any:
+    # drive the coroutine step by step and record CPU time spent in its steps only,
+    # which excludes other coroutines running while it awaits
+    value, error = None, None
+    while True:
+        start = time.thread_time()
+        try:
+            future = coro.throw(error) if error else coro.send(value)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            # also count the step that raised
+            timing('cpu', (time.thread_time() - start) * TIME_PRECISION)
+
+        try:
+            value, error = (yield future), None
+        except BaseException as e:
+            value, error = None, e
+
+
+class Profiler:
+    """
+    Collects a cProfile profile of a run and summarizes it by user code and midge internals
+    """
+
+    def __init__(self, name: str, task_path: str) -> None:
+        self._name = name
+        self._task_directory = os.path.dirname(os.path.abspath(task_path))
+        self._midge_directory = os.path.dirname(os.path.abspath(__file__))
+        self._profile = cProfile.Profile()
+
+    def __enter__(self) -> 'Profiler':
+        global active
+        active = True
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *args) -> None:
+        global active
+        self._profile.disable()
+        active = False
+
+    def save(self) -> List[str]:
+        # return paths of the raw profile (for pstats, snakeviz, ...) and of its summary
+        profile_file = f'{self._name.lower()}.prof'
+        self._profile.dump_stats(profile_file)
+
+        summary_file = f'{self._name.lower()}.profile'
+        dump(self.summarize(), summary_file)
+        return [profile_file, summary_file]
+
+    def summarize(self) -> ProfileReport:
+        frames: Dict[str, List[FrameReport]] = {'user': [], 'midge': [], 'other': []}
+        for (file, line, function), (_, calls, own_time, cumulative_time, _) in pstats.Stats(self._profile).stats.items():
+            frames[self._category(file)].append(FrameReport(
+                function=function,
+                file=file,
+                line=line,
+                calls=calls,
+                own_time=round(own_time * TIME_PRECISION, 3),
+                cumulative_time=round(cumulative_time * TIME_PRECISION, 3),
+            ))
+
+        return {
+            category: ProfileCategoryReport(
+                own_time=round(sum(frame.own_time for frame in category_frames), 3),
+                top=sorted(category_frames, key=lambda frame: frame.own_time, reverse=True)[:TOP_FRAMES],
+            )
+            for category, category_frames in frames.items()
+        }
+
+    def _category(self, file: str) -> str:
+        file = os.path.abspath(file) if os.path.sep in file else file
+        if file.startswith(self._midge_directory):
+            return 'midge'
+        if file.startswith(self._task_directory) and 'site-packages' not in file:
+            return 'user'
+        return 'other'
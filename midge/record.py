@@ -1,8 +1,8 @@
 import json
+import math
 from typing import Any, Dict, List, Optional, TypeVar, Union
 
 from dataclass_marshal import dataclass, marshal, unmarshal
-from numpy import NaN
 
 MidgeId = str
 T = TypeVar('T')
@@ -25,6 +25,22 @@ class ActionLog(Record):
     end: float
     success: bool
     response: Any
+    timings: Optional[Dict[str, float]] = None
+    metrics: Optional[Dict[str, float]] = None
+    journey: Optional[str] = None
+
+
+@dataclass
+class LogMeta(Record):
+    stop_reason: Optional[str]
+
+
+@dataclass
+class LogChunk(Record):
+    file: str
+    start: float
+    end: float
+    count: int
 
 
 # Reports
@@ -90,12 +106,17 @@ class PerformanceReport(Record):
     duration: float
     requests: RequestsReport
     responses: ResponsesReport
+    timings: Optional[Dict[str, ResponseTimesReport]] = None
+    metrics: Optional[Dict[str, ResponseTimesReport]] = None
+    stop_reason: Optional[str] = None
 
     def compare(self, b: 'PerformanceReport') -> 'PerformanceReport':
         return PerformanceReport(
             duration=delta(self.duration, b.duration),
             requests=self.requests.compare(b.requests),
             responses=self.responses.compare(b.responses),
+            timings=compare_dict(self.timings, b.timings),
+            metrics=compare_dict(self.metrics, b.metrics),
         )
 
 
@@ -103,19 +124,88 @@ FullReport = Dict[str, PerformanceReport]
 
 
 @dataclass
-class DataPoint(Record):
-    action: str
-    timepoint: float
-    response_time: float
-    success: int
+class GateReport(Record):
+    metric: str
+    limit: float
+    change: float
+    ci_low: Optional[float]
+    ci_high: Optional[float]
+    regression: bool
+
+
+# Incremental analysis
+
+@dataclass
+class SeriesState(Record):
+    count: int
+    mean: float
+    m2: float
+    min: float
+    max: float
+    buckets: Dict[str, int]
+
+
+@dataclass
+class ReportState(Record):
+    first_start: float
+    last_start: float
+    last_end: float
+    succeeded: int
+    response_times: SeriesState
+    timings: Dict[str, SeriesState]
+    metrics: Dict[str, SeriesState]
+
+
+@dataclass
+class JourneyState(Record):
+    journey: str
+    start: float
+    end: float
+    success: bool
+
+
+@dataclass
+class FollowCheckpoint(Record):
+    offset: int
+    first_line: str
+    reports: Dict[str, ReportState]
+    journeys: Dict[MidgeId, JourneyState]
+
+
+# Profiles
+
+@dataclass
+class FrameReport(Record):
+    function: str
+    file: str
+    line: int
+    calls: int
+    own_time: float
+    cumulative_time: float
+
+
+@dataclass
+class ProfileCategoryReport(Record):
+    own_time: float
+    top: List[FrameReport]
+
+
+ProfileReport = Dict[str, ProfileCategoryReport]
 
 
 # Utils
 
+def compare_dict(a: Optional[Dict[str, ResponseTimesReport]],
+                 b: Optional[Dict[str, ResponseTimesReport]]) -> Optional[Dict[str, ResponseTimesReport]]:
+    if not a or not b:
+        return None
+    return {key: a[key].compare(b[key]) for key in a.keys() & b.keys()}
+
+
 def delta(a: float, b: float) -> Dict[str, float]:
     absolute = round(a - b, 3)
     if b == 0:
-        relative = NaN
+        relative = math.nan
     else:
         relative = round(absolute / b, 3)
     return {'relative': relative, 'absolute': absolute}
@@ -138,12 +228,29 @@ def dumps(obj: WritableRecord) -> str:
     return json.dumps(data, indent=2)
 
 
+def dumpl(obj: Record) -> str:
+    # a single compact JSON line, so records can be appended to a file as they come
+    return json.dumps(marshal(obj)) + '\n'
+
+
 def load(file_name: str, cls: Optional[T] = None) -> T:
     with open(file_name.lower(), 'r') as input_file:
         data = json.load(input_file)
     return unmarshal(data, cls) if cls else data
 
 
+def load_lines(file_name: str, cls: Optional[T] = None) -> List[T]:
+    # read records written as JSON lines; files written by `dump` (a JSON list) are read as well
+    with open(file_name, 'r') as input_file:
+        if input_file.read(1) == '[':
+            input_file.seek(0)
+            data = json.load(input_file)
+        else:
+            input_file.seek(0)
+            data = [json.loads(line) for line in input_file if line.strip()]
+    return unmarshal(data, List[cls]) if cls else data
+
+
 def loadd(payload: Dict[Any, Any], cls: T) -> T:
     return unmarshal(payload, cls)
 
@@ -0,0 +1,111 @@
+import asyncio
+import csv
+import json
+import logging
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from midge.core import Task
+from midge.errors import FeederExhausted, MidgeValueError
+from midge.record import ActionLog
+
+
+class TraceEntry(NamedTuple):
+    time: float
+    action: str
+    params: Dict[str, Any]
+
+
+def read_trace(file_path: str) -> Iterator[TraceEntry]:
+    # stream entries of a JSONL trace ({"time": .., "action": .., "params": {..}})
+    # or a CSV trace (time,action,<param>,...); time is in seconds
+    with open(file_path, 'r', newline='') as input_file:
+        if file_path.endswith('.csv'):
+            for row in csv.DictReader(input_file):
+                time = float(row.pop('time'))
+                action = row.pop('action')
+                yield TraceEntry(time, action, row)
+        else:
+            for line in input_file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                yield TraceEntry(float(entry['time']), entry['action'], entry.get('params') or {})
+
+
+class Replay:
+    """
+    Replays a timestamped trace of actions at their recorded offsets
+    """
+
+    def __init__(self, identifier: str,
+                 task_definition: type,
+                 trace_path: str,
+                 speed: float = 1.) -> None:
+        if speed <= 0:
+            raise MidgeValueError('Invalid replay setting/s', locals())
+        self._id = f'R@{identifier}'
+        self._task = Task(task_definition)
+        self._trace_path = trace_path
+        self._speed = speed
+        self._pending = set()
+        self.stop_reason: Optional[str] = None
+        self._sinks: List[Callable[[ActionLog], None]] = []
+
+    async def setup(self):
+        await self._task.setup()
+
+    async def run(self) -> List[ActionLog]:
+        self._logs = []
+        self.stop_reason = None
+        start: Optional[float] = None
+        first: Optional[float] = None
+        loop = asyncio.get_running_loop()
+
+        logging.info(f'Replaying {self._trace_path} at {self._speed}x speed')
+
+        for entry in read_trace(self._trace_path):
+            if self.stop_reason:
+                break
+            action = self._task.get_action(entry.action)
+            if action is None:
+                logging.warning(f'Skipping unknown action {entry.action}')
+                continue
+
+            if first is None:
+                start, first = loop.time(), entry.time
+            fire_at = start + (entry.time - first) / self._speed
+            await asyncio.sleep(max(fire_at - loop.time(), 0))
+
+            future = loop.create_task(self._task.run_action(self._id, action, entry.params))
+            future.add_done_callback(self._on_action_complete)
+            self._pending.add(future)
+
+        if self._pending:
+            await asyncio.wait(list(self._pending))
+
+        logging.info('Replay finished')
+
+        return self._logs
+
+    async def teardown(self):
+        await self._task.teardown()
+
+    def add_sink(self, sink: Callable[[ActionLog], None]) -> None:
+        # sinks receive every action log as it completes; logs are only kept in memory without sinks
+        self._sinks.append(sink)
+
+    # Callbacks
+
+    def _on_action_complete(self, future: asyncio.Task) -> None:
+        self._pending.discard(future)
+        try:
+            log = future.result()
+        except FeederExhausted as e:
+            if not self.stop_reason:
+                logging.info(f'Stopping replay - {e}')
+                self.stop_reason = str(e)
+            return
+        if not self._sinks:
+            self._logs.append(log)
+        for sink in self._sinks:
+            sink(log)
@@ -0,0 +1,87 @@
+import random
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from midge.core import AliasTable
+from midge.errors import MidgeValueError
+
+ThinkTime = Union[float, Tuple[float, float], Callable[[random.Random], float]]
+
+
+def scenario(steps: Union[List[str], Dict[str, Dict[str, float]]],
+             think: Union[ThinkTime, Dict[str, ThinkTime]] = 0,
+             start: Optional[str] = None,
+             weight: int = 1) -> 'Scenario':
+    if not steps or weight < 1 or (start and start not in steps):
+        raise MidgeValueError('Invalid scenario setting/s', locals())
+    return Scenario(steps, think=think, start=start, weight=weight)
+
+
+class Scenario:
+    """
+    User journey executed by a single midge: an ordered list of actions, or a Markov chain of
+    actions ({action: {next action: probability}}, remaining probability ends the journey),
+    with think time (seconds, (min, max) range or a callable) before each step
+    """
+
+    def __init__(self, steps: Union[List[str], Dict[str, Dict[str, float]]],
+                 think: Union[ThinkTime, Dict[str, ThinkTime]] = 0,
+                 start: Optional[str] = None,
+                 weight: int = 1) -> None:
+        self.name = 'scenario'
+        self.__midge_scenario__ = True
+        self.__weight__ = weight
+        self._think = think
+
+        if isinstance(steps, dict):
+            self._sequence = None
+            self._start = start or next(iter(steps))
+            self.steps = {self._start, *steps, *(step for transitions in steps.values() for step in transitions)}
+            self._transitions = {
+                step: _transition_table(transitions)
+                for step, transitions in steps.items()
+            }
+        else:
+            # steps of ordered journeys are tracked by position, so actions can repeat
+            self._sequence = list(steps)
+            self._start = self._sequence.index(start) if start else 0
+            self.steps = set(steps)
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def first_step(self) -> Union[int, str]:
+        return self._start
+
+    def next_step(self, step: Union[int, str], rng: random.Random) -> Optional[Union[int, str]]:
+        # return the step following the given one, or None when the journey ends
+        if self._sequence is not None:
+            return step + 1 if step + 1 < len(self._sequence) else None
+        table = self._transitions.get(step)
+        return table.sample(rng) if table else None
+
+    def action(self, step: Union[int, str]) -> str:
+        return self._sequence[step] if self._sequence is not None else step
+
+    def think_time(self, step: Union[int, str], rng: random.Random) -> float:
+        think = self._think.get(self.action(step), 0) if isinstance(self._think, dict) else self._think
+        if callable(think):
+            return think(rng)
+        if isinstance(think, tuple):
+            return rng.uniform(*think)
+        return think
+
+
+def _transition_table(transitions: Dict[str, float]) -> Optional[AliasTable]:
+    total = sum(transitions.values())
+    if total > 1 + 1e-9 or any(probability < 0 for probability in transitions.values()):
+        raise MidgeValueError('Invalid scenario transitions', locals())
+    if not total:
+        return None
+
+    items: List[Optional[str]] = list(transitions)
+    weights = list(transitions.values())
+    if total < 1:
+        # remaining probability ends the journey
+        items.append(None)
+        weights.append(1 - total)
+    return AliasTable(items, weights)
@@ -0,0 +1,351 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import gzip
+import itertools
+import json
+import logging
+import lzma
+import math
+import os
+import queue
+import sqlite3
+from threading import Thread
+import time
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from midge import record
+from midge.errors import MidgeValueError
+from midge.metrics import TIME_PRECISION
+from midge.record import ActionLog, LogChunk, LogMeta, dumpl
+
+T = TypeVar('T')
+# (since, until) in seconds from the first request of a LOG, either can be open
+Window = Tuple[Optional[float], Optional[float]]
+
+BATCH_SIZE = 10000
+BATCH_WAIT_SEC = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS swarms (
+    id INTEGER PRIMARY KEY,
+    run INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    stop_reason TEXT
+);
+CREATE TABLE IF NOT EXISTS actions (
+    run INTEGER NOT NULL REFERENCES runs (id),
+    swarm INTEGER NOT NULL REFERENCES swarms (id),
+    midge TEXT NOT NULL,
+    action TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    success INTEGER NOT NULL,
+    response TEXT,
+    timings TEXT,
+    metrics TEXT,
+    journey TEXT
+);
+CREATE INDEX IF NOT EXISTS actions_run_action_start ON actions (run, action, start);
+"""
+
+INDEX_SUFFIX = '.index'
+META_SUFFIX = '.meta'
+# compression -> (chunk file suffix, open function)
+COMPRESSIONS: Dict[str, Tuple[str, Callable[..., IO[str]]]] = {
+    'gzip': ('.gz', partial(gzip.open, compresslevel=6)),
+    'lzma': ('.xz', lzma.open),
+}
+READ_WORKERS = os.cpu_count()
+
+_STOP = object()
+
+
+class SQLiteSink:
+    """
+    Writes action logs into a SQLite database, in large batched transactions from a background thread
+    """
+
+    def __init__(self, db_path: str, name: str, batch_size: int = BATCH_SIZE) -> None:
+        self._db_path = db_path
+        self._batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue()
+
+        with connect(db_path) as connection:
+            self.run_id = connection.execute('INSERT INTO runs (name, started) VALUES (?, ?)',
+                                             (name, time.time())).lastrowid
+
+        self._thread = Thread(target=self._write, name='midge-sqlite-sink', daemon=True)
+        self._thread.start()
+
+    def add_swarm(self, name: str) -> int:
+        with connect(self._db_path) as connection:
+            return connection.execute('INSERT INTO swarms (run, name) VALUES (?, ?)', (self.run_id, name)).lastrowid
+
+    def finish_swarm(self, swarm_id: int, stop_reason: Optional[str]) -> None:
+        with connect(self._db_path) as connection:
+            connection.execute('UPDATE swarms SET stop_reason = ? WHERE id = ?', (stop_reason, swarm_id))
+
+    def write(self, swarm_id: int, log: ActionLog) -> None:
+        # called on the hot path; rows are only built by the background thread
+        self._queue.put((swarm_id, log))
+
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    # Utils
+
+    def _write(self) -> None:
+        connection = connect(self._db_path)
+        stopped = False
+        while not stopped:
+            batch, stopped = _next_batch(self._queue, self._batch_size)
+            if batch:
+                with connection:
+                    connection.executemany('INSERT INTO actions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                           [self._row(swarm_id, log) for swarm_id, log in batch])
+        connection.close()
+        logging.info(f'Run {self.run_id} saved in {self._db_path}')
+
+    def _row(self, swarm_id: int, log: ActionLog) -> Tuple[Any, ...]:
+        return (self.run_id, swarm_id, log.midge, log.action, log.start, log.end, int(log.success),
+                _dumps(log.response), _dumps(log.timings), _dumps(log.metrics), log.journey)
+
+
+class LogSink:
+    """
+    Streams action logs into a LOG file as JSON lines while the run is going, so the file can be followed
+    """
+
+    def __init__(self, file_path: str, batch_size: int = BATCH_SIZE) -> None:
+        self.file_path = file_path
+        self._batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue()
+        self._file = open(self.file_path, 'w')
+
+        self._thread = Thread(target=self._write, name='midge-log-sink', daemon=True)
+        self._thread.start()
+
+    def write(self, log: ActionLog) -> None:
+        self._queue.put(log)
+
+    def close(self, stop_reason: Optional[str] = None) -> None:
+        self._queue.put(_STOP)
+        self._thread.join()
+        # saved next to the LOG, so a later analysis reports why the run stopped
+        with open(f'{self.file_path}{META_SUFFIX}', 'w') as output_file:
+            output_file.write(record.dumps(LogMeta(stop_reason=stop_reason)))
+
+    # Utils
+
+    def _write(self) -> None:
+        stopped = False
+        while not stopped:
+            batch, stopped = _next_batch(self._queue, self._batch_size)
+            if batch:
+                self._write_batch(batch)
+        self._finish()
+
+    def _write_batch(self, batch: List[ActionLog]) -> None:
+        # flushed per batch, so followers never wait longer than BATCH_WAIT_SEC
+        self._file.writelines(dumpl(log) for log in batch)
+        self._file.flush()
+
+    def _finish(self) -> None:
+        self._file.close()
+
+
+class ChunkedLogSink(LogSink):
+    """
+    Streams action logs into LOG chunks, rotated by size and/or age and optionally compressed,
+    and lists every finished chunk with its time range in an index (<file>.index)
+    """
+
+    def __init__(self, file_path: str,
+                 rotate_size: Optional[int] = None,
+                 rotate_interval: Optional[float] = None,
+                 compression: Optional[str] = None,
+                 batch_size: int = BATCH_SIZE) -> None:
+        if (rotate_size is not None and rotate_size <= 0) or (rotate_interval is not None and rotate_interval <= 0) \
+                or (compression and compression not in COMPRESSIONS):
+            raise MidgeValueError('Invalid log sink setting/s', locals())
+        self._chunk_path = file_path
+        self._rotate_size = rotate_size
+        self._rotate_interval = rotate_interval
+        self._suffix, self._open_chunk = COMPRESSIONS[compression] if compression else ('', open)
+        self._chunks = itertools.count(1)
+        self._chunk: Optional[IO[str]] = None
+        super().__init__(f'{file_path}{INDEX_SUFFIX}', batch_size=batch_size)
+
+    # Utils
+
+    def _write_batch(self, batch: List[ActionLog]) -> None:
+        for log in batch:
+            if self._chunk is None:
+                self._start_chunk()
+            line = dumpl(log)
+            self._chunk.write(line)
+            self._chunk_entry.count += 1
+            self._chunk_entry.start = min(self._chunk_entry.start, log.start)
+            self._chunk_entry.end = max(self._chunk_entry.end, log.end)
+            self._chunk_size += len(line)
+
+            if (self._rotate_size and self._chunk_size >= self._rotate_size) or \
+                    (self._rotate_interval and time.monotonic() - self._chunk_started >= self._rotate_interval):
+                self._finish_chunk()
+
+    def _finish(self) -> None:
+        if self._chunk is not None:
+            self._finish_chunk()
+        super()._finish()
+
+    def _start_chunk(self) -> None:
+        chunk_path = f'{self._chunk_path}.{next(self._chunks):05d}{self._suffix}'
+        self._chunk = self._open_chunk(chunk_path, 'wt')
+        self._chunk_entry = LogChunk(file=os.path.basename(chunk_path), start=math.inf, end=-math.inf, count=0)
+        self._chunk_size = 0
+        self._chunk_started = time.monotonic()
+
+    def _finish_chunk(self) -> None:
+        # chunks are only listed once complete, so readers never see a partially written one
+        self._chunk.close()
+        self._chunk = None
+        self._file.write(dumpl(self._chunk_entry))
+        self._file.flush()
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(db_path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def load(db_path: str, run_id: int, swarm: Optional[str] = None) -> List[ActionLog]:
+    query = ('SELECT actions.midge, action, start, end, success, response, timings, metrics, journey '
+             'FROM actions JOIN swarms ON swarms.id = actions.swarm WHERE actions.run = ?')
+    params: Tuple[Any, ...] = (run_id,)
+    if swarm:
+        query += ' AND swarms.name = ?'
+        params += (swarm,)
+    query += ' ORDER BY start'
+
+    with connect(db_path) as connection:
+        return [
+            ActionLog(midge=midge, action=action, start=start, end=end, success=bool(success),
+                      response=_loads(response), timings=_loads(timings), metrics=_loads(metrics), journey=journey)
+            for midge, action, start, end, success, response, timings, metrics, journey
+            in connection.execute(query, params)
+        ]
+
+
+def load_stop_reason(db_path: str, run_id: int, swarm: Optional[str] = None) -> Optional[str]:
+    query = 'SELECT stop_reason FROM swarms WHERE run = ? AND stop_reason IS NOT NULL'
+    params: Tuple[Any, ...] = (run_id,)
+    if swarm:
+        query += ' AND name = ?'
+        params += (swarm,)
+
+    with connect(db_path) as connection:
+        return '; '.join(reason for reason, in connection.execute(query + ' ORDER BY id', params)) or None
+
+
+def history(db_path: str, action: Optional[str] = None) -> List[Dict[str, Any]]:
+    # aggregate every run in the database, computed by SQLite without loading action logs
+    query = ('SELECT runs.id, runs.name, runs.started, COUNT(*), AVG(success), '
+             'AVG(end - start), MIN(start), MAX(end) '
+             'FROM runs JOIN actions ON actions.run = runs.id')
+    params: Tuple[Any, ...] = ()
+    if action:
+        query += ' WHERE actions.action = ?'
+        params = (action,)
+    query += ' GROUP BY runs.id ORDER BY runs.id'
+
+    with connect(db_path) as connection:
+        return [
+            {
+                'run': run_id,
+                'name': name,
+                'started': started,
+                'requests': count,
+                'success_rate': success_rate,
+                'mean_response_time': mean_response_time,
+                'avg_per_sec': count / ((end - start) / 1000) if end > start else None,
+            }
+            for run_id, name, started, count, success_rate, mean_response_time, start, end
+            in connection.execute(query, params)
+        ]
+
+
+def load_log(file_path: str, cls: Optional[T] = None, window: Optional[Window] = None) -> List[T]:
+    # load a LOG file or a chunked LOG (its index), optionally only requests started within
+    # a time window (seconds since the first request); chunks are read in parallel
+    if file_path.endswith(INDEX_SUFFIX):
+        chunks = record.load_lines(file_path, LogChunk)
+        log_start = min((chunk.start for chunk in chunks), default=0)
+        if window:
+            chunks = [chunk for chunk in chunks if _overlaps(chunk, log_start, window)]
+        directory = os.path.dirname(file_path)
+        with ThreadPoolExecutor(max_workers=READ_WORKERS) as executor:
+            logs = [log for chunk_logs in executor.map(partial(read_chunk, directory), chunks) for log in chunk_logs]
+    else:
+        logs = record.load_lines(file_path)
+        log_start = min((log['start'] for log in logs), default=0)
+
+    if window:
+        since, until = _window_bounds(log_start, window)
+        logs = [log for log in logs if since <= log['start'] < until]
+    return record.loadd(logs, List[cls]) if cls else logs
+
+
+def load_log_stop_reason(file_path: str) -> Optional[str]:
+    meta_path = f'{file_path}{META_SUFFIX}'
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r') as input_file:
+        return record.loads(input_file.read(), LogMeta).stop_reason
+
+
+def read_chunk(directory: str, chunk: LogChunk) -> List[Dict[str, Any]]:
+    _, open_chunk = next((codec for codec in COMPRESSIONS.values() if chunk.file.endswith(codec[0])), ('', open))
+    with open_chunk(os.path.join(directory, chunk.file), 'rt') as input_file:
+        return [json.loads(line) for line in input_file if line.strip()]
+
+
+def _overlaps(chunk: LogChunk, log_start: float, window: Window) -> bool:
+    since, until = _window_bounds(log_start, window)
+    return chunk.start < until and chunk.end >= since
+
+
+def _window_bounds(log_start: float, window: Window) -> Tuple[float, float]:
+    since, until = window
+    return (log_start + since * TIME_PRECISION if since is not None else -math.inf,
+            log_start + until * TIME_PRECISION if until is not None else math.inf)
+
+
+def _next_batch(items: queue.Queue, batch_size: int) -> Tuple[List[Any], bool]:
+    # block for the first item, then collect what arrives within BATCH_WAIT_SEC
+    batch = []
+    item = items.get()
+    deadline = time.monotonic() + BATCH_WAIT_SEC
+    while item is not _STOP:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            return batch, False
+        try:
+            item = items.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            return batch, False
+    return batch, True
+
+
+def _dumps(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, default=repr)
+
+
+def _loads(value: Optional[str]) -> Any:
+    return None if value is None else json.loads(value)
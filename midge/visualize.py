@@ -1,84 +1,121 @@
-from typing import List
+import io
+from typing import Any, Dict, List, Optional
 
 import matplotlib.pyplot as plt
-import pandas as pd
-import seaborn as sns
+import numpy as np
 
-from midge.record import ActionLog
-import midge.record as record
+from midge.errors import MidgeValueError
+from midge.sink import Window, load_log
 
 BINS = 50
+PERCENTILES = (50, 95, 99)
 
 
-def log(file_name: str):
-    logs = record.load(file_name, List[ActionLog])
+def log(file_name: str, output_format: str = 'svg', headless: bool = False, window: Optional[Window] = None):
+    if headless:
+        plt.switch_backend('Agg')
+
+    # raw records are enough for binning, no need to unmarshal them into ActionLogs
+    logs = load_log(file_name, window=window)
+    if not logs:
+        raise MidgeValueError('No requests to visualize', locals())
     time_series = to_time_series(logs, BINS)
-    df = pd.DataFrame([record.dumpd(x) for x in time_series])
 
+    fig = plt.figure()
     ax1 = plt.subplot2grid((9, 1), (0, 0), rowspan=7)
     ax2 = plt.subplot2grid((9, 1), (7, 0))
     ax3 = plt.subplot2grid((9, 1), (8, 0))
 
-    _plot_response_times(ax1, df)
-    _plot_requests(ax2, df)
-    _plot_success(ax3, df)
+    _plot_response_times(ax1, time_series)
+    _plot_requests(ax2, time_series)
+    _plot_success(ax3, time_series)
 
     plt.subplots_adjust()
-    plt.savefig(f'{file_name}.svg', format='svg')
-    plt.show()
-
+    _save(fig, f'{file_name}.{output_format}', output_format)
+    if not headless:
+        plt.show()
 
-def to_time_series(logs: List[ActionLog], bins: int):
-    logs = sorted(logs, key=lambda o: o.start)
 
-    # get time boundary
-    start_time = logs[0].start
-    end_time = logs[-1].start
+def to_time_series(logs: List[Dict[str, Any]], bins: int) -> Dict[str, Any]:
+    # aggregate logs into N time bins per action; cost of plotting is proportional to bins
+    start = np.fromiter((log['start'] for log in logs), dtype=np.float64, count=len(logs))
+    end = np.fromiter((log['end'] for log in logs), dtype=np.float64, count=len(logs))
+    success = np.fromiter((log['success'] for log in logs), dtype=np.float64, count=len(logs))
+    actions, action_index = np.unique([log['action'] for log in logs], return_inverse=True)
+    response_times = end - start
 
     # get intervals
-    min_bin = start_time
-    diff_time = end_time - start_time
-    bin_duration = (diff_time / bins)
-
-    time_series = []
-    timepoint = 0
-
-    # build time-series aggregated on N time-points
-    for log in logs:
-        if log.start >= (min_bin + bin_duration):
-            timepoint += 1
-            min_bin += bin_duration
-            if timepoint > bins - 1:
-                break
-        datapoint = record.DataPoint(log.action, timepoint, (log.end - log.start), int(log.success))
-        time_series.append(datapoint)
-    return time_series
-
-
-def _plot_response_times(ax, df):
+    start_time, end_time = start.min(), start.max()
+    bin_duration = (end_time - start_time) / bins or 1
+    timepoint = np.minimum(((start - start_time) // bin_duration).astype(np.int64), bins - 1)
+
+    # group = (action, bin)
+    groups = action_index * bins + timepoint
+    n_groups = len(actions) * bins
+    count = np.bincount(groups, minlength=n_groups)
+    succeeded = np.bincount(groups, weights=success, minlength=n_groups)
+
+    # percentiles per group: sort by group, then by response time, and pick ranks within each group
+    order = np.lexsort((response_times, groups))
+    sorted_times = response_times[order]
+    offsets = np.concatenate(([0], np.cumsum(count)[:-1]))
+    percentiles = {}
+    for q in PERCENTILES:
+        rank = offsets + np.floor((count - 1).clip(min=0) * q / 100).astype(np.int64)
+        values = sorted_times[rank.clip(max=len(sorted_times) - 1)]
+        percentiles[f'p{q}'] = np.where(count > 0, values, np.nan).reshape(len(actions), bins)
+
+    total = count.reshape(len(actions), bins).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        success_rate = succeeded.reshape(len(actions), bins).sum(axis=0) / total
+
+    return {
+        'actions': list(actions),
+        'timepoints': np.arange(bins),
+        'count': count.reshape(len(actions), bins),
+        'success_rate': success_rate,
+        **percentiles,
+    }
+
+
+def _save(fig, file_name: str, output_format: str) -> None:
+    if output_format == 'html':
+        svg = io.StringIO()
+        fig.savefig(svg, format='svg')
+        with open(file_name, 'w') as output_file:
+            output_file.write(f'<!DOCTYPE html>\n<html><body>\n{svg.getvalue()}\n</body></html>\n')
+    else:
+        fig.savefig(file_name, format=output_format)
+
+
+def _plot_response_times(ax, time_series):
     ax.grid(which='major', axis='y', linestyle=':')
-    sns.lineplot(x='timepoint', y='response_time', hue='action', data=df,
-                 markers=True,
-                 style='action',
-                 ci=95,
-                 ax=ax)
+    for i, action in enumerate(time_series['actions']):
+        line, = ax.plot(time_series['timepoints'], time_series['p50'][i], marker='o', markersize=3, label=action)
+        ax.plot(time_series['timepoints'], time_series['p95'][i], color=line.get_color(), linestyle='--')
+        ax.plot(time_series['timepoints'], time_series['p99'][i], color=line.get_color(), linestyle=':')
+    ax.legend(title='p50 / p95 / p99')
     ax.set_ylim(bottom=0)
     ax.set_xlim(0, BINS - 1)
-    ax.set_xlabel('')
+    ax.set_ylabel('response_time')
     ax.set_xticks([])
     ax.get_yaxis().set_label_coords(-0.04, 0.5)
 
 
-def _plot_requests(ax, df):
-    sns.countplot(x='timepoint', hue='action', data=df, ax=ax)
-    ax.set_xlabel('')
+def _plot_requests(ax, time_series):
+    bottom = np.zeros(len(time_series['timepoints']))
+    for i, _ in enumerate(time_series['actions']):
+        ax.bar(time_series['timepoints'], time_series['count'][i], bottom=bottom)
+        bottom += time_series['count'][i]
+    ax.set_xlim(-0.5, BINS - 0.5)
     ax.set_ylabel('action')
     ax.set_xticks([])
-    ax.legend().set_visible(False)
     ax.get_yaxis().set_label_coords(-0.04, 0.5)
 
 
-def _plot_success(ax, df):
-    sns.barplot(x='timepoint', y='success', color='green', data=df, ax=ax, alpha=0.6)
-    ax.legend().set_visible(False)
+def _plot_success(ax, time_series):
+    ax.bar(time_series['timepoints'], time_series['success_rate'], color='green', alpha=0.6)
+    ax.set_xlim(-0.5, BINS - 0.5)
+    ax.set_ylim(0, 1)
+    ax.set_ylabel('success')
     ax.get_yaxis().set_label_coords(-0.04, 0.5)
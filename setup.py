@@ -25,7 +25,7 @@ setup(
             'pytest-asyncio==0.9.0',
         ],
         'visualize': [
-            'seabor==0.9.0'
+            'matplotlib',
         ]
     },
     include_package_data=True,
@@ -0,0 +1,13 @@
+import asyncio
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _event_loop():
+    # a fresh current loop per test; asyncio.run (e.g. in CLI commands) leaves none behind
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    asyncio.set_event_loop(None)
+    loop.close()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from midge.analysis import analyze, gate, parse_gates
+from midge.errors import MidgeValueError
+from midge.record import ActionLog
+
+
+def _logs(response_times, rps=100):
+    return [
+        ActionLog(midge='M1', action='dummy', start=i * 1000 / rps, end=i * 1000 / rps + rt, success=True, response=None)
+        for i, rt in enumerate(response_times)
+    ]
+
+
+def test_parse_gates():
+    assert parse_gates('p99:+10%,rps:-5%') == [('p99', 0.1), ('rps', -0.05)]
+
+
+@pytest.mark.parametrize('gates', ['p42:+10%', 'p99:+ten%', 'p99', 'p99:10%'])
+def test_parse_invalid_gates(gates):
+    with pytest.raises(MidgeValueError):
+        parse_gates(gates)
+
+
+@pytest.mark.parametrize('shift, regression', [
+    (1.0, False),
+    (1.5, True),
+])
+def test_gate(shift, regression):
+    rng = np.random.RandomState(42)
+    baseline = _logs(rng.lognormal(4, 0.5, 2000))
+    logs = _logs(rng.lognormal(4, 0.5, 2000) * shift)
+
+    reports = gate(logs, baseline, parse_gates('p95:+10%,mean:+10%'), seed=42)
+
+    assert [report.regression for report in reports] == [regression, regression]
+
+
+def test_gate_within_limit():
+    rng = np.random.RandomState(42)
+    baseline = _logs(rng.lognormal(4, 0.5, 2000))
+    logs = _logs(rng.lognormal(4, 0.5, 2000) * 1.12)
+
+    # p95 changed by more than 10%, but not significantly more
+    report, = gate(logs, baseline, parse_gates('p95:+10%'), seed=42)
+
+    assert report.change > 0.1 and report.ci_low < 0.1
+    assert report.regression is False
+
+
+def test_unfinished_journeys():
+    def step(midge, journey, start, success=True):
+        return ActionLog(midge=midge, action='browse', start=start, end=start + 5, success=success, response=None,
+                         journey=journey)
+
+    logs = [
+        step('M1', 'checkout#1', 0), step('M1', 'checkout#1', 10), step('M2', 'checkout#1', 20),
+        step('M1', 'checkout#2', 30, success=False), step('M2', 'leave#2', 40),
+        # in progress
+        step('M1', 'checkout#3', 50), step('M2', 'leave#3', 60),
+    ]
+
+    report = analyze(logs)
+
+    assert report['journey:checkout'].requests.total == 3
+    assert report['journey:checkout'].responses.succeeded == 2
+    assert report['journey:checkout'].responses.response_times.max == 15
+    assert report['journey:leave'].requests.total == 1
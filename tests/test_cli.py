@@ -0,0 +1,122 @@
+import importlib.util
+import subprocess
+import sys
+
+import pytest
+
+
+@pytest.mark.parametrize('module', [
+    'matplotlib',
+    'numpy',
+    'pandas',
+    'seaborn',
+])
+def test_cli_does_not_import_heavy_modules(module):
+    code = f'import sys, midge.cli; sys.exit(int({module!r} in sys.modules))'
+    assert subprocess.run([sys.executable, '-c', code]).returncode == 0
+
+
+MIXED_WORKLOAD = '''
+import asyncio
+
+import midge
+
+
+@midge.swarm(population=2, total_requests=60)
+class ReadTask:
+    @midge.action()
+    async def read(self):
+        await asyncio.sleep(0.05)
+        return None, True
+
+
+@midge.swarm(population=2, duration=1)
+class WriteTask:
+    @midge.action()
+    async def write(self):
+        await asyncio.sleep(0.01)
+        return None, True
+'''
+
+
+def test_run_concurrent(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+
+    from midge import record
+    from midge.cli import midgectl
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'mixed_workload.py').write_text(MIXED_WORKLOAD)
+
+    result = CliRunner().invoke(midgectl, ['run', '--concurrent', '--analyze', str(tmp_path / 'mixed_workload.py')])
+    assert result.exit_code == 0, result.output
+
+    read_logs = record.load_lines('readtask.log', record.ActionLog)
+    write_logs = record.load_lines('writetask.log', record.ActionLog)
+    combined_logs = record.load_lines('mixed_workload-combined.log', record.ActionLog)
+    assert len(read_logs) == 60
+    assert sorted(log.start for log in combined_logs) == sorted(log.start for log in read_logs + write_logs)
+
+    # both swarms are swarming at the same time
+    assert min(log.start for log in read_logs) < max(log.end for log in write_logs)
+    assert min(log.start for log in write_logs) < max(log.end for log in read_logs)
+
+    report = record.load('mixed_workload-combined.report', record.FullReport)
+    assert report['*'].stop_reason == 'Total requests are reached; Time duration is reached'
+
+    # stop reasons are saved with the logs, so a later analysis still reports them
+    result = CliRunner().invoke(midgectl, ['analyze', 'readtask.log'])
+    assert result.exit_code == 0, result.output
+    assert record.load('readtask.report', record.FullReport)['*'].stop_reason == 'Total requests are reached'
+
+
+def test_compare_invalid_gate():
+    from click.testing import CliRunner
+
+    from midge.cli import midgectl
+
+    result = CliRunner().invoke(midgectl, ['compare', 'baseline.log', 'dummy.log', '--gate', 'p99:+ten%'])
+
+    assert result.exit_code == 2
+    assert 'Invalid value for --gate' in result.output
+
+
+@pytest.mark.parametrize('baseline_path, report_path', [
+    ('baseline.log', 'dummy.report'),
+    ('baseline.report', 'midge.db:1'),
+])
+def test_compare_mixed_inputs(baseline_path, report_path):
+    from click.testing import CliRunner
+
+    from midge.cli import midgectl
+
+    result = CliRunner().invoke(midgectl, ['compare', baseline_path, report_path])
+
+    assert result.exit_code == 2
+    assert 'Expected two LOGS or two REPORTS' in result.output
+
+
+@pytest.mark.parametrize('command', [
+    ['analyze', 'slow.log'],
+    pytest.param(['visualize', 'slow.log', '--headless'], marks=pytest.mark.skipif(
+        importlib.util.find_spec('matplotlib') is None, reason='matplotlib is not installed')),
+])
+def test_empty_window(tmp_path, monkeypatch, command):
+    from click.testing import CliRunner
+
+    from midge import record
+    from midge.cli import midgectl
+
+    monkeypatch.chdir(tmp_path)
+    with open('slow.log', 'w') as output_file:
+        output_file.writelines(record.dumpl(record.ActionLog(
+            midge='M1', action='read', start=i * 100., end=i * 100. + 50, success=True, response=None,
+        )) for i in range(100))
+
+    result = CliRunner().invoke(midgectl, [*command, '--window', '1000:2000'])
+
+    assert result.exit_code == 2
+    assert 'No requests of slow.log started within the window' in result.output
+
+    result = CliRunner().invoke(midgectl, [*command, '--window', '1:2'])
+    assert result.exit_code == 0, result.output
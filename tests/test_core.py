@@ -1,12 +1,20 @@
+from array import array
 import asyncio
+from collections import Counter
 import inspect
+import os
+import random
+import subprocess
+import sys
+import time
 from unittest.mock import MagicMock, call
 
 import pytest
 
 import midge
-from midge.core import ActionResult, Swarm, now, Midge, Task
+from midge.core import ActionResult, AliasTable, Swarm, now, Midge, Task, _MidgeRandom
 from midge.record import ActionLog
+from midge.utils import import_midge_file
 
 _MIDGE_ID_FORMAT = 'M{}@S{}'
 
@@ -88,3 +96,385 @@ def test_swarm_limit_requests(swarm_id, population, rps, total_requests):
     # reset
     DummyActions.spy = MagicMock()
     DummyActions.callers = set()
+
+
+@pytest.mark.parametrize('swarm_id, population, rps, total_requests', [
+    (1340, 1000, 100, 200),
+    (1341, 1000, None, 2000),
+])
+def test_compact_swarm_limit_requests(swarm_id, population, rps, total_requests):
+    DummyActions.callers = set()
+    swarm = Swarm(
+        identifier=swarm_id,
+        population=population,
+        task_definition=DummyActions,
+        rps=rps,
+        total_requests=total_requests,
+        duration=None,
+        compact=True,
+    )
+
+    loop = asyncio.get_event_loop()
+
+    loop.run_until_complete(swarm.setup())
+    start_ms = now()
+    action_logs = loop.run_until_complete(swarm.run())
+    end_ms = now()
+    loop.run_until_complete(swarm.teardown())
+
+    # validate
+
+    midge_ids = {f'V{i}@S{swarm_id}' for i in range(population)}
+
+    assert len(action_logs) == total_requests
+    assert all(log.success is True and
+               log.midge in midge_ids and
+               log.start >= start_ms and log.end <= end_ms
+               for log in action_logs)
+
+    # all virtual midges share a single task instance
+    assert len(DummyActions.callers) == 1
+
+    # reset
+    DummyActions.spy = MagicMock()
+    DummyActions.callers = set()
+
+
+def test_swarm_sinks():
+    swarm = Swarm(identifier=1, task_definition=DummyActions, population=2, total_requests=20)
+    streamed = []
+    swarm.add_sink(streamed.append)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(swarm.setup())
+    kept = loop.run_until_complete(swarm.run())
+    loop.run_until_complete(swarm.teardown())
+
+    # logs go to sinks only
+    assert kept == []
+    assert len(streamed) == 20
+    assert all(isinstance(log, ActionLog) for log in streamed)
+
+
+class SlowActions:
+    started = 0
+    finished = 0
+    at_teardown = None
+
+    @midge.action()
+    async def slow(self) -> ActionResult:
+        SlowActions.started += 1
+        # outlasts the rest of the second the midge waits before firing again
+        await asyncio.sleep(1.2)
+        SlowActions.finished += 1
+        return 'OK', True
+
+    async def teardown(self):
+        SlowActions.at_teardown = (SlowActions.started, SlowActions.finished)
+
+
+def test_rps_actions_drained():
+    swarm = Swarm(identifier=1, task_definition=SlowActions, population=1, rps=20, total_requests=5)
+    stop = swarm.stop
+    started_at_stop = []
+    swarm.stop = lambda reason: (started_at_stop.append(SlowActions.started), stop(reason))
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(swarm.setup())
+    loop.run_until_complete(swarm.run())
+    # nothing is left running, and no action is fired once the swarm stops
+    assert asyncio.all_tasks(loop) == set()
+    loop.run_until_complete(swarm.teardown())
+
+    started, finished = SlowActions.at_teardown
+    assert started == finished == started_at_stop[0]
+
+
+class BlockingActions:
+
+    @midge.action(executor='thread', max_workers=2)
+    def block(self) -> ActionResult:
+        time.sleep(0.05)
+        return 'OK', True
+
+
+def test_executor_action():
+    swarm = Swarm(
+        identifier=1342,
+        population=4,
+        task_definition=BlockingActions,
+        total_requests=20,
+    )
+
+    loop = asyncio.get_event_loop()
+
+    loop.run_until_complete(swarm.setup())
+    action_logs = loop.run_until_complete(swarm.run())
+    loop.run_until_complete(swarm.teardown())
+
+    assert len(action_logs) == 20
+    assert all(log.success is True and log.response == 'OK' for log in action_logs)
+    # call is timed inside the pool, waiting for a free worker is reported separately
+    assert all(log.end - log.start >= 50 for log in action_logs)
+    assert all(log.timings['queue'] >= 0 for log in action_logs)
+
+    # 4 concurrent actions share 2 workers, so 2 of them have to wait
+    task = Task(BlockingActions)
+    concurrent_logs = loop.run_until_complete(asyncio.gather(
+        *[task.run_action('M1', task.get_action('block')) for _ in range(4)]
+    ))
+    assert sum(log.timings['queue'] >= 40 for log in concurrent_logs) == 2
+
+
+@midge.swarm(population=2, total_requests=6)
+class ProcessActions:
+
+    @midge.action(executor='process', max_workers=2)
+    def pid(self) -> ActionResult:
+        return os.getpid(), True
+
+    @midge.action(executor='process')
+    def echo(self, value=None) -> ActionResult:
+        return value, True
+
+
+def test_process_executor_action():
+    swarm = ProcessActions()
+    loop = asyncio.get_event_loop()
+
+    loop.run_until_complete(swarm.setup())
+    action_logs = loop.run_until_complete(swarm.run())
+    loop.run_until_complete(swarm.teardown())
+
+    assert len(action_logs) == 6
+    assert all(log.success is True and log.response != os.getpid() for log in action_logs)
+
+    # arguments that can not be pickled fail the action, not the swarm
+    task = Task(ProcessActions.__midge_task__)
+    log = loop.run_until_complete(task.run_action('M1', task.get_action('echo'), params={'value': lambda: None}))
+    assert log.success is False and log.response is None
+
+
+PROCESS_MIDGE_FILE = '''
+import os
+
+import midge
+
+
+@midge.swarm(population=2, total_requests=6)
+class ProcessTask:
+
+    @midge.action(executor='process', max_workers=2, start_method={start_method!r})
+    def pid(self) -> midge.ActionResult:
+        return os.getpid(), True
+'''
+
+
+@pytest.mark.parametrize('start_method', ['fork', 'spawn', 'forkserver'])
+def test_process_executor_start_methods(tmp_path, start_method):
+    # workers started from a fresh interpreter import the midge file themselves
+    midge_file = tmp_path / f'process_{start_method}.py'
+    midge_file.write_text(PROCESS_MIDGE_FILE.format(start_method=start_method))
+    swarm = import_midge_file(str(midge_file))['ProcessTask']()
+    assert str(tmp_path) not in sys.path
+    loop = asyncio.get_event_loop()
+
+    loop.run_until_complete(swarm.setup())
+    action_logs = loop.run_until_complete(swarm.run())
+    loop.run_until_complete(swarm.teardown())
+
+    assert [log.success for log in action_logs] == [True] * 6
+    assert all(log.response != os.getpid() for log in action_logs)
+
+
+class UnpicklableActions:
+
+    @midge.action(executor='process')
+    def echo(self, value=None) -> ActionResult:
+        return value, True
+
+
+def test_process_executor_failure_logged(caplog):
+    task = Task(UnpicklableActions)
+    loop = asyncio.get_event_loop()
+
+    for _ in range(3):
+        log = loop.run_until_complete(task.run_action('M1', task.get_action('echo'), params={'value': lambda: None}))
+        assert log.success is False
+
+    # once per action
+    assert [record.getMessage() for record in caplog.records if record.levelname == 'ERROR'] == [
+        'Action echo failed in process pool'
+    ]
+
+
+class MeasuredActions:
+
+    @midge.action()
+    async def query(self) -> ActionResult:
+        with midge.timer('wait'):
+            await asyncio.sleep(0.02)
+        midge.metric('rows', 42)
+        return 'OK', True
+
+    @midge.action()
+    async def ping(self) -> ActionResult:
+        return 'OK', True
+
+
+def test_action_timings_and_metrics():
+    task = Task(MeasuredActions)
+    loop = asyncio.get_event_loop()
+
+    query = loop.run_until_complete(task.run_action('M1', task.get_action('query')))
+    ping = loop.run_until_complete(task.run_action('M1', task.get_action('ping')))
+
+    assert query.timings['wait'] >= 20
+    assert query.metrics == {'rows': 42}
+    assert ping.timings is None and ping.metrics is None
+
+
+@pytest.mark.parametrize('weights', [
+    [1],
+    [1, 1],
+    [1, 2, 7],
+    [5, 1, 1, 3],
+])
+def test_alias_table(weights):
+    table = AliasTable(list(range(len(weights))), weights)
+    rng = random.Random(1337)
+    samples = 100000
+
+    counts = Counter(table.sample(rng) for _ in range(samples))
+
+    for item, weight in enumerate(weights):
+        assert counts[item] / samples == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+class WeightedActions:
+
+    @midge.action(weight=1)
+    async def read(self) -> ActionResult:
+        return 'OK', True
+
+    @midge.action(weight=3)
+    async def write(self) -> ActionResult:
+        return 'OK', True
+
+
+def test_seeded_action_choice():
+    def choices(seed):
+        task = Task(WeightedActions, rng=random.Random(seed))
+        return [task._choose_action().__name__ for _ in range(100)]
+
+    assert choices(42) == choices(42)
+    assert choices(42) != choices(43)
+
+
+class JitteredActions:
+
+    @midge.action(weight=1)
+    async def read(self) -> ActionResult:
+        # unseeded latency, so actions of different midges complete in a different order every run
+        await asyncio.sleep(random.random() / 100)
+        return 'OK', True
+
+    @midge.action(weight=3)
+    async def write(self) -> ActionResult:
+        await asyncio.sleep(random.random() / 100)
+        return 'OK', True
+
+
+def test_seeded_compact_action_choice():
+    def choices(seed):
+        # closed loop, so midges draw their next action in the order their previous ones completed
+        swarm = Swarm(identifier=1, task_definition=JitteredActions, population=4,
+                      total_requests=400, compact=True, seed=seed)
+        loop = asyncio.get_event_loop()
+        loop.run_until_complete(swarm.setup())
+        logs = loop.run_until_complete(swarm.run())
+        loop.run_until_complete(swarm.teardown())
+        per_midge = {}
+        for log in sorted(logs, key=lambda log: log.start):
+            per_midge.setdefault(log.midge, []).append(log.action)
+        return per_midge
+
+    def same_prefix(a, b):
+        # which midge reaches the request limit first depends on timing
+        return all(a[midge][:n] == b[midge][:n] and n >= 5
+                   for midge in a.keys() & b.keys()
+                   for n in [min(len(a[midge]), len(b[midge]))])
+
+    assert same_prefix(choices(42), choices(42))
+    assert not same_prefix(choices(42), choices(43))
+
+
+def test_midge_random():
+    states = array('Q', [1, 2])
+    first, second = _MidgeRandom(states, 0), _MidgeRandom(states, 1)
+
+    draws = [first.random() for _ in range(10000)]
+    # the sequence of a midge only depends on its own state
+    second.random()
+    replayed = _MidgeRandom(array('Q', [1]), 0)
+    assert [replayed.random() for _ in range(3)] == draws[:3]
+
+    assert all(0 <= draw < 1 for draw in draws)
+    assert sum(draws) / len(draws) == pytest.approx(0.5, abs=0.02)
+    assert {first.randrange(3) for _ in range(100)} == {0, 1, 2}
+    assert all(first.getrandbits(k).bit_length() <= k for k in (0, 1, 63, 64, 65, 128))
+    assert 1 <= first.uniform(1, 2) <= 2
+
+
+class JourneyActions:
+    checkout = midge.scenario(['login', 'browse', 'browse', 'buy'], think={'buy': 0.01})
+    leave = midge.scenario({'login': {'browse': 0.5}, 'browse': {}}, weight=2)
+
+    @midge.action()
+    async def login(self) -> ActionResult:
+        return 'OK', True
+
+    @midge.action()
+    async def browse(self) -> ActionResult:
+        return 'OK', True
+
+    @midge.action()
+    async def buy(self) -> ActionResult:
+        return 'OK', True
+
+
+def test_scenarios():
+    task = Task(JourneyActions, rng=random.Random(1337))
+    loop = asyncio.get_event_loop()
+
+    logs = [loop.run_until_complete(task.run('M1')) for _ in range(200)]
+
+    journeys = {}
+    for log in logs:
+        journeys.setdefault(log.journey, []).append(log.action)
+    # the last journey may be unfinished
+    finished = list(journeys.values())[:-1]
+
+    assert {tuple(steps) for steps in finished} == {
+        ('login', 'browse', 'browse', 'buy'),
+        ('login', 'browse'),
+        ('login',),
+    }
+
+
+def test_import_outside_event_loop_thread():
+    # the event loop is looked up when midges run, not when midge is imported
+    code = '''
+import sys, threading
+errors = []
+def load():
+    try:
+        import midge.core
+    except Exception as e:
+        errors.append(e)
+thread = threading.Thread(target=load)
+thread.start()
+thread.join()
+sys.exit(len(errors))
+'''
+    assert subprocess.run([sys.executable, '-c', code]).returncode == 0
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+import midge
+from midge.core import Swarm
+from midge.errors import FeederExhausted
+from midge.feeder import Feeder
+
+_ROWS = [{'id': str(i), 'name': f'user{i}'} for i in range(10)]
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / 'users.csv'
+    path.write_text('id,name\n' + ''.join(f'{row["id"]},{row["name"]}\n' for row in _ROWS))
+    return str(path)
+
+
+@pytest.mark.parametrize('shard, shards', [
+    (0, 1),
+    (0, 3),
+    (2, 3),
+])
+def test_feeder_sequential(data_file, shard, shards):
+    feeder = Feeder(data_file, 'sequential', shard, shards)
+    expected = _ROWS[shard::shards]
+
+    records = [next(feeder) for _ in range(len(expected) * 2)]
+
+    # wraps around after the last record of the shard
+    assert records == expected * 2
+
+
+def test_feeder_unique(data_file):
+    feeder = Feeder(data_file, 'unique', 0, 1)
+
+    assert list(feeder) == _ROWS
+    with pytest.raises(FeederExhausted):
+        next(feeder)
+
+
+def test_feeder_random(data_file):
+    feeder = Feeder(data_file, 'random', 1, 2)
+
+    records = [next(feeder) for _ in range(100)]
+
+    assert all(record in _ROWS[1::2] for record in records)
+    assert len({record['id'] for record in records}) > 1
+
+
+@pytest.mark.parametrize('order', ['sequential', 'random', 'unique'])
+@pytest.mark.parametrize('file_name', ['empty.csv', 'empty.jsonl'])
+def test_feeder_empty_file(tmp_path, order, file_name):
+    path = tmp_path / file_name
+    path.write_text('')
+    feeder = Feeder(str(path), order, 0, 1)
+
+    assert list(feeder) == []
+    with pytest.raises(FeederExhausted):
+        next(feeder)
+    feeder.close()
+
+
+def test_exhausted_feeder_stops_swarm(data_file):
+    class UniqueUsers:
+        users = Feeder(data_file, 'unique', 0, 1)
+
+        @midge.action()
+        async def login(self) -> midge.ActionResult:
+            return next(self.users)['id'], True
+
+    swarm = Swarm(identifier=1, task_definition=UniqueUsers, population=2, total_requests=20)
+    loop = asyncio.get_event_loop()
+
+    loop.run_until_complete(swarm.setup())
+    logs = loop.run_until_complete(swarm.run())
+    loop.run_until_complete(swarm.teardown())
+
+    # every record is used once, and no request is logged as failed once they run out
+    assert sorted(log.response for log in logs) == sorted(row['id'] for row in _ROWS)
+    assert all(log.success for log in logs)
+    assert swarm.stop_reason == f'All records of {data_file} are used'
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from midge import record
+from midge.analysis import analyze
+from midge.errors import MidgeValueError
+from midge.follow import Follower, Series
+from midge.record import ActionLog
+from midge.sink import ChunkedLogSink
+
+
+def _logs(n):
+    rng = np.random.RandomState(42)
+    return [
+        ActionLog(midge=f'M{i % 3}', action='read' if i % 2 else 'write', start=i * 10.,
+                  end=i * 10. + rng.lognormal(4, 0.5), success=i % 7 != 0, response=None,
+                  timings={'ttfb': float(i % 10)}, journey=f'checkout#{i // 6}')
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize('value', [0, 0.5, 3, 120.7, 10 ** 6, -4.2])
+def test_series_buckets(value):
+    series = Series()
+    for _ in range(3):
+        series.add(value)
+
+    assert series.percentile(50) == pytest.approx(value, rel=0.01)
+    assert Series(series.state()).buckets == series.buckets
+
+
+def test_follower(tmp_path):
+    log_file = str(tmp_path / 'dummy.log')
+    logs = _logs(1000)
+
+    follower = Follower(log_file)
+    with open(log_file, 'w') as output_file:
+        output_file.writelines(record.dumpl(log) for log in logs[:400])
+        # a line still being written is left for the next poll
+        output_file.write(record.dumpl(logs[400])[:20])
+    assert follower.poll() == 400
+
+    with open(log_file, 'w') as output_file:
+        output_file.writelines(record.dumpl(log) for log in logs)
+    assert follower.poll() == 600
+    assert follower.poll() == 0
+
+    report, expected = follower.report(), analyze(logs)
+    assert list(report) == ['*', 'write', 'read', 'journey:checkout']
+    for key in ['*', 'write', 'read']:
+        assert report[key].requests.total == expected[key].requests.total
+        assert report[key].responses.succeeded == expected[key].responses.succeeded
+        assert report[key].duration == expected[key].duration
+        assert report[key].responses.response_times.mean == pytest.approx(expected[key].responses.response_times.mean)
+        assert report[key].responses.response_times.stdev == pytest.approx(expected[key].responses.response_times.stdev)
+        for q in ['p50', 'p90', 'p99']:
+            assert getattr(report[key].responses.response_times, q) == \
+                pytest.approx(getattr(expected[key].responses.response_times, q), rel=0.05)
+    # the last journey of each midge is still in progress, and left out by both
+    assert report['journey:checkout'].requests.total == expected['journey:checkout'].requests.total
+    assert report['journey:checkout'].responses.succeeded == expected['journey:checkout'].responses.succeeded
+
+
+def test_follower_checkpoint(tmp_path):
+    log_file = str(tmp_path / 'dummy.log')
+    logs = _logs(100)
+
+    with open(log_file, 'w') as output_file:
+        output_file.writelines(record.dumpl(log) for log in logs[:50])
+    follower = Follower(log_file)
+    follower.poll()
+    checkpoint = record.loads(record.dumps(follower.checkpoint()), record.FollowCheckpoint)
+
+    with open(log_file, 'a') as output_file:
+        output_file.writelines(record.dumpl(log) for log in logs[50:])
+    resumed = Follower(log_file, checkpoint)
+    assert resumed.offset == follower.offset
+    assert resumed.poll() == 50
+    assert resumed.report()['*'].requests.total == 100
+
+    # a new LOG of the same name is read from the start
+    with open(log_file, 'w') as output_file:
+        output_file.writelines(record.dumpl(log) for log in logs[1:])
+    assert Follower(log_file, checkpoint).offset == 0
+
+
+def test_follower_rejects_json_list(tmp_path):
+    log_file = str(tmp_path / 'dummy.log')
+    record.dump(_logs(10), log_file)
+
+    with pytest.raises(MidgeValueError):
+        Follower(log_file).poll()
+
+
+def test_follower_chunked_log(tmp_path):
+    log_sink = ChunkedLogSink(str(tmp_path / 'dummy.log'), rotate_size=2000, compression='gzip')
+    logs = _logs(100)
+    for log in logs:
+        log_sink.write(log)
+    log_sink.close()
+
+    follower = Follower(log_sink.file_path)
+    assert follower.poll() == 100
+    assert follower.report()['*'].requests.total == 100
@@ -0,0 +1,102 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from midge import guards
+from midge.guards import ErrorRate, Guard, Latency, Saturation
+from midge.record import ActionLog
+
+
+def _log(end: float, response_time: float = 10, success: bool = True) -> ActionLog:
+    return ActionLog(midge='M1', action='dummy', start=end - response_time, end=end, success=success, response=None)
+
+
+@pytest.mark.parametrize('failures_every, stops', [
+    (2, True),
+    (20, False),
+])
+def test_error_rate(failures_every, stops):
+    guard = ErrorRate(max_rate=0.1, window=1, min_requests=10)
+
+    reasons = [guard.update(_log(end=i * 10, success=i % failures_every != 0)) for i in range(1, 101)]
+
+    assert any(reasons) is stops
+
+
+def test_error_rate_sliding_window():
+    guard = ErrorRate(max_rate=0.1, window=1, min_requests=10)
+
+    # failures fall out of the 1 second window before enough requests are seen
+    reasons = [guard.update(_log(end=i * 500, success=False)) for i in range(1, 11)]
+
+    assert not any(reasons)
+
+
+@pytest.mark.parametrize('response_time, duration, stops', [
+    (600, 3, True),
+    (600, 10, False),
+    (400, 3, False),
+])
+def test_latency(response_time, duration, stops):
+    guard = Latency(threshold=500, percentile=99, duration=duration)
+
+    # 5 seconds of 10 actions per second
+    reasons = [guard.update(_log(end=1000 + i * 100, response_time=response_time)) for i in range(51)]
+
+    assert any(reasons) is stops
+
+
+@pytest.mark.parametrize('response_time, stops', [
+    (600, True),
+    (400, False),
+])
+def test_latency_out_of_order(response_time, stops):
+    guard = Latency(threshold=500, percentile=99, duration=3)
+
+    # concurrent actions are reported out of order of their end
+    rng = random.Random(42)
+    ends = sorted((1000 + i * 10 for i in range(500)), key=lambda end: end + rng.uniform(0, 1000))
+    reasons = [guard.update(_log(end=end, response_time=response_time)) for end in ends]
+
+    assert any(reasons) is stops
+
+
+@pytest.mark.parametrize('cpu_per_sec, stops', [
+    (0.95, True),
+    (0.5, False),
+])
+def test_saturation(monkeypatch, cpu_per_sec, stops):
+    clock = SimpleNamespace(wall=0., cpu=0.)
+    monkeypatch.setattr(guards, 'time', SimpleNamespace(monotonic=lambda: clock.wall, process_time=lambda: clock.cpu))
+    guard = Saturation(max_cpu=0.9, duration=3)
+
+    reasons = []
+    for _ in range(40):
+        # 10 actions per second
+        clock.wall += 0.1
+        clock.cpu += 0.1 * cpu_per_sec
+        reasons.append(guard.update(_log(end=clock.wall * 1000)))
+
+    assert any(reasons) is stops
+
+
+def test_saturation_sparse_completions(monkeypatch):
+    clock = SimpleNamespace(wall=0., cpu=0.)
+    monkeypatch.setattr(guards, 'time', SimpleNamespace(monotonic=lambda: clock.wall, process_time=lambda: clock.cpu))
+    guard = Saturation(max_cpu=0.9, duration=10)
+
+    reasons = []
+    for _ in range(5):
+        # a saturated load generator completes an action every 4 seconds
+        clock.wall += 4
+        clock.cpu += 4
+        reasons.append(guard.update(_log(end=clock.wall * 1000)))
+
+    # saturated for 12 seconds, not 3 evaluations
+    assert [bool(reason) for reason in reasons] == [False, False, True, True, True]
+
+
+def test_guard_is_abstract():
+    with pytest.raises(TypeError):
+        Guard()
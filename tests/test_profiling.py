@@ -0,0 +1,108 @@
+import asyncio
+import importlib.util
+import json
+import time
+
+from midge import profiling
+from midge.core import now
+from midge.metrics import ActionContext, _context
+from midge.profiling import Profiler, cpu_timed
+
+
+def _burn(duration: float) -> None:
+    start = time.thread_time()
+    while time.thread_time() - start < duration:
+        pass
+
+
+def _cpu_timed(coro):
+    # run a coroutine in its own action context and return its result and the CPU time recorded for it
+    async def run():
+        context = ActionContext()
+        _context.set(context)
+        try:
+            return await cpu_timed(coro), context
+        except ValueError:
+            return None, context
+
+    async def run_alongside():
+        # the other coroutine burns CPU while the timed one awaits
+        result, context = (await asyncio.gather(run(), _busy_neighbour()))[0]
+        return result, context.timings['cpu']
+
+    return asyncio.get_event_loop().run_until_complete(run_alongside())
+
+
+async def _busy_neighbour():
+    await asyncio.sleep(0)
+    _burn(0.2)
+
+
+def test_cpu_timed_excludes_awaits():
+    async def action():
+        _burn(0.05)
+        await asyncio.sleep(0.01)
+        _burn(0.05)
+        return 'done'
+
+    result, cpu = _cpu_timed(action())
+
+    assert result == 'done'
+    assert 100 <= cpu < 180
+
+
+def test_cpu_timed_raising_action():
+    async def action():
+        _burn(0.05)
+        await asyncio.sleep(0.01)
+        _burn(0.05)
+        raise ValueError()
+
+    result, cpu = _cpu_timed(action())
+
+    assert result is None
+    assert 100 <= cpu < 180
+
+
+def test_cpu_timed_exception_thrown_into_action():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise KeyError()
+
+    async def action():
+        _burn(0.05)
+        try:
+            await asyncio.ensure_future(fail())
+        except KeyError:
+            _burn(0.05)
+        return 'recovered'
+
+    result, cpu = _cpu_timed(action())
+
+    assert result == 'recovered'
+    assert 100 <= cpu < 180
+
+
+def test_profiler_summarize(tmp_path):
+    task_path = tmp_path / 'task.py'
+    task_path.write_text(
+        'def user_function(midge_function, other_function):\n'
+        '    return [midge_function() for _ in range(10)], other_function([1, 2, 3])\n'
+    )
+    spec = importlib.util.spec_from_file_location('task', task_path)
+    task = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(task)
+
+    with Profiler('task', str(task_path)) as profiler:
+        assert profiling.active
+        task.user_function(now, json.dumps)
+    assert not profiling.active
+
+    report = profiler.summarize()
+
+    assert set(report) == {'user', 'midge', 'other'}
+    assert 'user_function' in [frame.function for frame in report['user'].top]
+    assert all(frame.file == str(task_path) for frame in report['user'].top)
+    now_frame, = [frame for frame in report['midge'].top if frame.function == 'now']
+    assert now_frame.calls == 10
+    assert 'dumps' in [frame.function for frame in report['other'].top]
@@ -31,7 +31,10 @@ from midge.record import (
             'start': 1.1,
             'end': 1.2,
             'success': True,
-            'response': {'status': 'OK'}
+            'response': {'status': 'OK'},
+            'timings': None,
+            'metrics': None,
+            'journey': None,
         }
 
     ),
@@ -82,7 +85,10 @@ from midge.record import (
                     'p99': 1,
                     'max': 1,
                 },
-            }
+            },
+            'timings': None,
+            'metrics': None,
+            'stop_reason': None,
         }
     )
 ])
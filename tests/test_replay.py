@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+import midge
+from midge.core import ActionResult
+from midge.errors import MidgeValueError
+from midge.replay import Replay, TraceEntry, read_trace
+
+
+class ReplayedActions:
+
+    @midge.action()
+    async def get(self, id: str = None) -> ActionResult:
+        return id, True
+
+
+@pytest.mark.parametrize('file_name, content', [
+    ('trace.jsonl', '{"time": 1.5, "action": "get", "params": {"id": "1"}}\n\n'
+                    '{"time": 2, "action": "put"}\n'),
+    ('trace.csv', 'time,action,id\n1.5,get,1\n2,put,\n'),
+])
+def test_read_trace(tmp_path, file_name, content):
+    trace_path = tmp_path / file_name
+    trace_path.write_text(content)
+
+    entries = list(read_trace(str(trace_path)))
+
+    assert entries[0] == TraceEntry(1.5, 'get', {'id': '1'})
+    assert entries[1].time == 2. and entries[1].action == 'put'
+
+
+@pytest.mark.parametrize('speed', [1., 2.])
+def test_replay(tmp_path, speed):
+    trace_path = tmp_path / 'trace.jsonl'
+    trace_path.write_text(
+        '{"time": 100, "action": "get", "params": {"id": "1"}}\n'
+        '{"time": 100.2, "action": "unknown"}\n'
+        '{"time": 100.2, "action": "get", "params": {"id": "2"}}\n'
+        '{"time": 100.4, "action": "get", "params": {"id": "3"}}\n'
+    )
+    replay = Replay('DummyReplay', ReplayedActions, str(trace_path), speed=speed)
+    streamed = []
+    replay.add_sink(streamed.append)
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(replay.setup())
+    kept = loop.run_until_complete(replay.run())
+    loop.run_until_complete(replay.teardown())
+
+    # logs go to sinks only; unknown actions are skipped
+    assert kept == []
+    assert [log.response for log in streamed] == ['1', '2', '3']
+    # recorded offsets are kept, scaled by the speed
+    offsets = [log.start - streamed[0].start for log in streamed]
+    assert offsets == pytest.approx([0, 200 / speed, 400 / speed], abs=30)
+
+
+def test_replay_settings(tmp_path):
+    with pytest.raises(MidgeValueError):
+        Replay('DummyReplay', ReplayedActions, str(tmp_path / 'trace.jsonl'), speed=0)
+
+
+def test_replay_exhausted_feeder(tmp_path):
+    ids_path = tmp_path / 'ids.txt'
+    ids_path.write_text('1\n2\n')
+
+    class FedActions:
+        ids = midge.feeder(str(ids_path), order='unique')
+
+        @midge.action()
+        async def get(self) -> ActionResult:
+            return next(self.ids), True
+
+    trace_path = tmp_path / 'trace.jsonl'
+    trace_path.write_text(''.join(f'{{"time": {i / 100}, "action": "get"}}\n' for i in range(5)))
+    replay = Replay('DummyReplay', FedActions, str(trace_path))
+
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(replay.setup())
+    logs = loop.run_until_complete(replay.run())
+    loop.run_until_complete(replay.teardown())
+
+    # the replay stops once the feeder runs out
+    assert [log.response for log in logs] == ['1', '2']
+    assert replay.stop_reason == f'All records of {ids_path} are used'
@@ -0,0 +1,81 @@
+import pytest
+
+from midge import record, sink
+from midge.errors import MidgeValueError
+from midge.record import ActionLog, LogChunk
+from midge.sink import ChunkedLogSink, LogSink, SQLiteSink
+
+
+def test_sqlite_sink(tmp_path):
+    db_path = str(tmp_path / 'midge.db')
+    logs = [
+        ActionLog(midge='M1', action='read' if i % 2 else 'write', start=i * 10, end=i * 10 + 5,
+                  success=i % 5 != 0, response={'i': i}, timings={'ttfb': 1.5} if i % 3 else None)
+        for i in range(100)
+    ]
+
+    db_sink = SQLiteSink(db_path, 'dummy', batch_size=7)
+    swarm_id = db_sink.add_swarm('DummySwarm')
+    for log in logs:
+        db_sink.write(swarm_id, log)
+    db_sink.finish_swarm(swarm_id, 'Total requests are reached')
+    db_sink.close()
+
+    assert sink.load(db_path, db_sink.run_id) == logs
+    assert sink.load(db_path, db_sink.run_id, swarm='OtherSwarm') == []
+    assert sink.load_stop_reason(db_path, db_sink.run_id) == 'Total requests are reached'
+
+    history = sink.history(db_path)
+    assert len(history) == 1
+    assert history[0]['requests'] == 100
+    assert history[0]['success_rate'] == 0.8
+    assert sink.history(db_path, action='read')[0]['requests'] == 50
+
+
+@pytest.mark.parametrize('compression, suffix', [
+    (None, ''),
+    ('gzip', '.gz'),
+    ('lzma', '.xz'),
+])
+def test_chunked_log_sink(tmp_path, compression, suffix):
+    log_path = str(tmp_path / 'dummy.log')
+    logs = [
+        ActionLog(midge='M1', action='read', start=i * 1000, end=i * 1000 + 5, success=True, response={'i': i})
+        for i in range(100)
+    ]
+
+    log_sink = ChunkedLogSink(log_path, rotate_size=1000, compression=compression, batch_size=7)
+    for log in logs:
+        log_sink.write(log)
+    log_sink.close()
+
+    chunks = record.load_lines(log_sink.file_path, LogChunk)
+    assert log_sink.file_path == f'{log_path}.index'
+    assert len(chunks) > 1
+    assert all(chunk.file.endswith(suffix) for chunk in chunks)
+    assert sum(chunk.count for chunk in chunks) == 100
+    assert sink.load_log(log_sink.file_path, ActionLog) == logs
+
+    # only chunks overlapping the window are read
+    assert sink.load_log(log_sink.file_path, ActionLog, window=(10, 20)) == logs[10:20]
+    assert sink.load_log(log_sink.file_path, ActionLog, window=(90, None)) == logs[90:]
+
+
+def test_chunked_log_sink_settings(tmp_path):
+    with pytest.raises(MidgeValueError):
+        ChunkedLogSink(str(tmp_path / 'dummy.log'), compression='zip')
+
+
+def test_log_sink_window(tmp_path):
+    log_path = str(tmp_path / 'dummy.log')
+    logs = [ActionLog(midge='M1', action='read', start=i * 500, end=i * 500 + 5, success=True, response=None)
+            for i in range(10)]
+
+    log_sink = LogSink(log_path)
+    for log in logs:
+        log_sink.write(log)
+    log_sink.close('Time duration is reached')
+
+    assert sink.load_log(log_path, ActionLog) == logs
+    assert sink.load_log_stop_reason(log_path) == 'Time duration is reached'
+    assert sink.load_log(log_path, ActionLog, window=(None, 2)) == logs[:4]
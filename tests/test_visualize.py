@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('matplotlib')
+
+from midge.visualize import to_time_series  # noqa: E402
+
+
+def _log(action, start, response_time, success=True):
+    return {'midge': 'M1', 'action': action, 'start': start, 'end': start + response_time, 'success': success}
+
+
+def test_to_time_series():
+    logs = [
+        # bin 0: [0, 5)
+        _log('a', 0, 1), _log('a', 1, 2), _log('a', 2, 3), _log('a', 3, 4),
+        _log('b', 4, 100, success=False),
+        # bin 1: [5, 10], the last start is clipped into the last bin
+        _log('a', 6, 10), _log('a', 7, 20), _log('a', 8, 30, success=False), _log('a', 10, 40),
+    ]
+
+    time_series = to_time_series(logs, bins=2)
+
+    assert time_series['actions'] == ['a', 'b']
+    assert time_series['timepoints'].tolist() == [0, 1]
+    assert time_series['count'].tolist() == [[4, 4], [1, 0]]
+    assert time_series['success_rate'].tolist() == [0.8, 0.75]
+    assert time_series['p50'][0].tolist() == [2, 20]
+    assert time_series['p95'][0].tolist() == [3, 30]
+    assert time_series['p99'][0].tolist() == [3, 30]
+    assert time_series['p50'][1][0] == 100
+    assert np.isnan(time_series['p50'][1][1])